@@ -83,8 +83,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'tracker.middleware.CompressionMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'tracker.middleware.SessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -92,6 +94,20 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Stack for /api/v1/ under WSGI (tracker/handlers.py). Token auth and JSON
+# only — no sessions, CSRF, messages or static files
+API_MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',  # enforces ALLOWED_HOSTS
+    'tracker.middleware.CompressionMiddleware',
+]
+
+# tracker.middleware.CompressionMiddleware: smallest body worth compressing,
+# in bytes, and the brotli quality (0-11; 4-6 suits on-the-fly compression).
+# Brotli is used only when the optional brotli package is installed.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_BROTLI_QUALITY = 5
+
 ROOT_URLCONF = 'budget.urls'
 
 if not DEBUG:
@@ -144,17 +160,33 @@ DATABASES['default']['CONN_MAX_AGE'] = 600  # keep connections alive 10min
 DATABASES['default']['OPTIONS'] = {'connect_timeout': 10}
 
 # Cache Configuration
-# WARNING: LocMemCache is per-process — rate limiting is unreliable with 3+ workers.
-# Upgrade to Redis for consistent auth protection:
-# pip install django-redis  →  CACHES = {'default': {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': os.getenv('REDIS_URL')}}
+# 'default' is a small per-process LRU (L1) in front of 'shared' (L2), which
+# every gunicorn worker sees — see tracker/cache.py. 'shared' is Redis when
+# REDIS_URL is set (needs `pip install redis`), otherwise a database table
+# created by `python manage.py createcachetable`. DatabaseCache can't
+# increment atomically, so without Redis the per-namespace stamps that
+# invalidate cached read models live in their own table (STAMPS).
+REDIS_URL = os.getenv('REDIS_URL')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'budget-cache',
+        'BACKEND': 'tracker.cache.TwoTierCache',
+        'OPTIONS': {
+            'L2': 'shared',
+            'STAMPS': 'l2' if REDIS_URL else 'database',
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+        }
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    } if REDIS_URL else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'budget_cache_table',
         'OPTIONS': {
             'MAX_ENTRIES': 10000
         }
-    }
+    },
 }
 
 if DEBUG:
@@ -180,6 +212,61 @@ else:
 
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY')
 
+# Email outbox (tracker/outbox.py): attempts before a message is dead-lettered,
+# base retry delay in seconds (doubles per attempt), and claim lease in seconds
+EMAIL_OUTBOX_MAX_ATTEMPTS = 6
+EMAIL_OUTBOX_BACKOFF = 30
+EMAIL_OUTBOX_LEASE = 120
+
+# Upper bound on how long per-user read models (dashboard, charts) stay
+# cached; writes invalidate them immediately via the data version
+DATA_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Longest income/expense series the charts endpoint returns; longer ranges
+# are downsampled server-side
+CHART_MAX_POINTS = 180
+
+# Largest batch accepted by /transactions/bulk/
+BULK_MAX_OPERATIONS = 500
+
+# Delta sync (/sync/changes/): days a deletion stays visible to clients —
+# older sync tokens get a full resync — and seconds re-read behind each
+# token to catch rows committed just after the previous read
+SYNC_TOMBSTONE_DAYS = 90
+SYNC_TOKEN_OVERLAP = 5
+
+# Lifetime of /api/v1/ bearer tokens (tracker/tokens.py), in seconds. A
+# password change revokes them early.
+API_TOKEN_MAX_AGE = 60 * 60 * 24 * 30
+
+# Loads user + profile in one query and caches the pair per user, see
+# tracker/backends.py. ModelBackend stays listed so sessions that were logged
+# in through it keep working (uncached) until their next login.
+AUTHENTICATION_BACKENDS = [
+    'tracker.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+AUTH_USER_CACHE_TIMEOUT = 3600
+
+# Password hashing. The first hasher of the active profile hashes new
+# passwords; the rest only verify older hashes, which Django re-hashes with the
+# first one on the user's next successful login. 'scrypt' (stdlib hashlib) is
+# memory-hard and costs far less CPU per login than 1M-round PBKDF2.
+PASSWORD_HASHER_PROFILES = {
+    'pbkdf2': [
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+    ],
+    'scrypt': [
+        'django.contrib.auth.hashers.ScryptPasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    ],
+}
+PASSWORD_HASHER_PROFILE = os.getenv('PASSWORD_HASHER_PROFILE', 'pbkdf2')
+PASSWORD_HASHERS = PASSWORD_HASHER_PROFILES[PASSWORD_HASHER_PROFILE]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -239,7 +326,39 @@ LOGIN_URL = 'login'
 CSRF_FAILURE_VIEW = 'tracker.views.csrf_failure_json'
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
 GROQ_API_KEY = os.environ.get('GROQ_API_KEY')
+# Lifetime (seconds) of the Gemini context cache holding the categorization prompt
+GEMINI_PROMPT_CACHE_TTL = int(os.environ.get('GEMINI_PROMPT_CACHE_TTL', 3600))
+# Smallest prompt the provider will cache for the pinned model; below it the
+# prompt is always sent inline
+GEMINI_PROMPT_CACHE_MIN_TOKENS = int(os.environ.get('GEMINI_PROMPT_CACHE_MIN_TOKENS', 4096))
+
+# Background AI jobs (audit, receipt scan): threads per process, and how long a
+# job may stay pending before the poll endpoint reports it as failed
+AI_JOB_WORKERS = int(os.environ.get('AI_JOB_WORKERS', 2))
+AI_JOB_TIMEOUT = 180
+
+# AI bulkhead: jobs one user may have pending at once, jobs one process may
+# hold queued or running, and per-user daily quotas
+AI_MAX_PENDING_PER_USER = 1
+AI_MAX_PENDING_PER_PROCESS = 8
+AI_DAILY_CALL_QUOTA = int(os.environ.get('AI_DAILY_CALL_QUOTA', 30))
+AI_DAILY_TOKEN_QUOTA = int(os.environ.get('AI_DAILY_TOKEN_QUOTA', 200_000))
+
+# Rate limiting (tracker/ratelimit.py). The database backend is shared by all
+# gunicorn workers out of the box; switch to 'tracker.ratelimit.CacheBackend'
+# once 'shared' is Redis. It must not point at 'default' — L1 would let each
+# worker count on its own.
+RATELIMIT_BACKEND = 'tracker.ratelimit.DatabaseBackend'
+RATELIMIT_CACHE_ALIAS = 'shared'
+
+# Emailed verification codes: lifetime in seconds, and wrong guesses allowed
+# per code before a new one must be requested
+OTP_TTL = 600
+OTP_MAX_ATTEMPTS = 5
 
 SESSION_COOKIE_AGE = 60 * 60 * 24 * 7
-SESSION_SAVE_EVERY_REQUEST = True
+# Rolling expiry is handled by tracker.middleware.SessionRefreshMiddleware,
+# which re-saves the session at most once per SESSION_REFRESH_THRESHOLD
+SESSION_SAVE_EVERY_REQUEST = False
+SESSION_REFRESH_THRESHOLD = SESSION_COOKIE_AGE // 2
 SESSION_EXPIRE_AT_BROWSER_CLOSE = False
\ No newline at end of file
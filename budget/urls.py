@@ -26,6 +26,8 @@ handler404 = 'tracker.views.custom_404_handler'
 handler500 = 'tracker.views.custom_500_handler'
 
 urlpatterns = [
+    # First, so API paths resolve without walking the HTML routes
+    path('api/v1/', include('tracker.api_urls')),
     path('secure-admin-9f3k76/', admin.site.urls),
     path('', include('tracker.urls')),
 ]
@@ -13,4 +13,16 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'budget.settings')
 
-application = get_wsgi_application()
+site_application = get_wsgi_application()
+
+# After get_wsgi_application(), which sets Django up
+from tracker.handlers import API_PREFIX, ApiHandler  # noqa: E402
+
+api_application = ApiHandler()
+
+
+def application(environ, start_response):
+    """Sends /api/v1/ to the trimmed API stack, everything else to the full one."""
+    if environ.get('PATH_INFO', '').startswith(API_PREFIX):
+        return api_application(environ, start_response)
+    return site_application(environ, start_response)
@@ -9,5 +9,8 @@ python manage.py collectstatic --no-input --clear
 # Force migrations even if Django is confused
 python manage.py migrate --no-input --fake-initial
 
+# Table behind the shared cache when REDIS_URL is not set (no-op otherwise)
+python manage.py createcachetable
+
 # Run the admin script
 python create_admin.py
\ No newline at end of file
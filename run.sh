@@ -4,12 +4,18 @@ set -e
 echo "Applying migrations..."
 python manage.py migrate
 
+echo "Creating cache table..."
+python manage.py createcachetable
+
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
 echo "Creating superuser if needed..."
 python create_admin.py
 
+echo "Starting email outbox worker..."
+python manage.py process_outbox --loop &
+
 echo "Starting Gunicorn..."
 exec gunicorn budget.wsgi:application \
     --bind 0.0.0.0:8000 \
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Transaction, BudgetGoal, UserProfile
+from .models import Transaction, BudgetGoal, UserProfile, OutboundEmail, Tombstone
 # Register your models here.
 class TransactionAdmin(admin.ModelAdmin):
     list_display = (
@@ -29,4 +29,19 @@ admin.site.register(BudgetGoal, BudgetGoalAdmin)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'currency_code')
     search_fields = ('user__username',)
-admin.site.register(UserProfile, UserProfileAdmin)
\ No newline at end of file
+admin.site.register(UserProfile, UserProfileAdmin)
+
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('created_at', 'sent_at')
+    # Bodies hold verification codes and reset links
+    exclude = ('html_content',)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
+
+class TombstoneAdmin(admin.ModelAdmin):
+    list_display = ('user', 'kind', 'object_id', 'deleted_at')
+    list_filter = ('kind',)
+    search_fields = ('user__username',)
+admin.site.register(Tombstone, TombstoneAdmin)
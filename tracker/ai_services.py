@@ -1,6 +1,7 @@
 import json
 import re
 import logging
+import threading
 import urllib.request
 from django.conf import settings
 from PIL import Image
@@ -25,6 +26,21 @@ def _get_gemini_client():
     return _gemini_client
 
 
+# Tokens used by model calls on the current thread. The AI job runner reads and
+# resets this after each job to charge the user's daily token quota.
+_usage = threading.local()
+
+
+def _record_tokens(count):
+    _usage.tokens = getattr(_usage, 'tokens', 0) + (count or 0)
+
+
+def take_token_usage() -> int:
+    tokens = getattr(_usage, 'tokens', 0)
+    _usage.tokens = 0
+    return tokens
+
+
 def _groq_chat(prompt: str, max_tokens: int = 2048) -> str:
     """
     Call Groq's REST API using only Python stdlib — no extra packages.
@@ -58,6 +74,7 @@ def _groq_chat(prompt: str, max_tokens: int = 2048) -> str:
     try:
         with urllib.request.urlopen(req, timeout=30) as resp:
             data = json.loads(resp.read())
+            _record_tokens((data.get("usage") or {}).get("total_tokens"))
             return data["choices"][0]["message"]["content"]
     except urllib.error.HTTPError as e:
         body = e.read().decode('utf-8', errors='replace')
@@ -96,6 +113,8 @@ def scan_receipt(image_file):
             contents=[prompt, img]
         )
 
+        _record_tokens(getattr(response.usage_metadata, 'total_token_count', 0))
+
         text = response.text
         match = re.search(r'\{.*\}', text, re.DOTALL)
         if match:
@@ -0,0 +1,295 @@
+"""
+Versioned JSON API, mounted at /api/v1/ (see api_urls.py).
+
+Unlike the dual-mode views in views.py these only ever answer JSON: no
+templates, forms, messages or sessions. Requests authenticate with a bearer
+token (tokens.py) and, under the WSGI entry point, skip the HTML middleware
+stack entirely (see handlers.py and API_MIDDLEWARE). Responses are built
+from values() projections so no model instances are created.
+"""
+import json
+import time
+from datetime import datetime
+from django.conf import settings
+from django.http import Http404
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_http_methods, require_POST
+
+from . import schemas, services
+from .decorators import token_required
+from .models import BudgetGoal, Transaction
+from .periods import Period
+from .queries import filter_transactions
+from .responses import FastJsonResponse
+from .ratelimit import check_ratelimit, reset_ratelimit, RateLimitError
+from .tokens import issue_token
+from .utils import get_ip
+
+PAGE_SIZE = 50
+
+_MONTH_ERROR = 'year and month must be integers naming a month from 0001-01 to 9999-11.'
+
+TRANSACTION_FIELDS = ('id', 'date', 'type', 'category', 'description', 'amount')
+GOAL_FIELDS = ('id', 'category', 'target_amount', 'month', 'year')
+
+
+def _error(message, status):
+    return FastJsonResponse({'status': 'error', 'message': message}, status=status)
+
+
+def _json_body(request):
+    """The request body as a dict; raises ValueError."""
+    payload = json.loads(request.body or b'{}')
+    if not isinstance(payload, dict):
+        raise ValueError
+    return payload
+
+
+def _transaction_row(user_id, pk):
+    return Transaction.objects.filter(user_id=user_id, pk=pk).values(*TRANSACTION_FIELDS).first()
+
+
+def _chart_params(request):
+    """(start, end, granularity) from ?start=&end=&granularity=; raises ValueError."""
+    granularity = request.GET.get('granularity') or 'month'
+    if granularity not in ('day', 'week', 'month'):
+        raise ValueError('granularity must be day, week or month.')
+    try:
+        start = request.GET.get('start')
+        end = request.GET.get('end')
+        first = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        last = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    except ValueError:
+        raise ValueError('Dates must be YYYY-MM-DD.')
+    return first, last, granularity
+
+
+def _month_param(request):
+    """(year, month) from ?year=&month=, defaulting to the current month; raises ValueError."""
+    now = timezone.localdate()
+    year = int(request.GET.get('year') or now.year)
+    month = int(request.GET.get('month') or now.month)
+    # Same bounds the read models will need: a month whose end is a real date
+    Period.month(year, month)
+    return year, month
+
+
+# ── Auth ───────────────────────────────────────────────────────
+
+@csrf_exempt
+@require_POST
+def token(request):
+    """{"username", "password"} -> {"token", "expires_in"}. Same limits as the login form."""
+    try:
+        payload = _json_body(request)
+    except ValueError:
+        return _error('Invalid JSON', 400)
+
+    username = str(payload.get('username') or '').strip()
+    ratelimit_key = f"login_fail_{get_ip(request)}_{username}" if username else f"login_fail_{get_ip(request)}"
+    try:
+        check_ratelimit(ratelimit_key, limit=10, period=60)
+    except RateLimitError as e:
+        return _error(str(e), 429)
+
+    user, status = services.login_service(request, schemas.LoginDTO(
+        username=username, password=str(payload.get('password') or ''),
+    ))
+    if status == 'unverified':
+        return _error('Account not verified.', 403)
+    if status != 'success':
+        return _error('Invalid credentials.', 401)
+
+    reset_ratelimit(ratelimit_key, period=60)
+    return FastJsonResponse({
+        'status': 'success',
+        'token': issue_token(user),
+        'expires_in': getattr(settings, 'API_TOKEN_MAX_AGE', 30 * 86400),
+    })
+
+
+# ── Transactions ───────────────────────────────────────────────
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+@token_required
+def transactions(request):
+    """
+    GET: the user's transactions, newest first, PAGE_SIZE per ?page=, with the
+    list filters (q, category, start_date, end_date). POST: create one.
+    """
+    user_id = request.user.id
+
+    if request.method == 'POST':
+        try:
+            dto = services.transaction_dto_from_payload(user_id, _json_body(request))
+        except ValueError as e:
+            return _error(str(e) or 'Invalid JSON', 400)
+        txn = services.create_transaction(dto)
+        return FastJsonResponse({'status': 'success', 'data': _transaction_row(user_id, txn.pk)}, status=201)
+
+    try:
+        page = max(1, int(request.GET.get('page') or 1))
+    except ValueError:
+        return _error('page must be a positive integer.', 400)
+
+    qs, _ = filter_transactions(request, request.user)
+    offset = (page - 1) * PAGE_SIZE
+    # One extra row answers has_next without a COUNT(*)
+    rows = list(qs.values(*TRANSACTION_FIELDS)[offset:offset + PAGE_SIZE + 1])
+    return FastJsonResponse({
+        'status': 'success',
+        'data': rows[:PAGE_SIZE],
+        'page': page,
+        'has_next': len(rows) > PAGE_SIZE,
+    })
+
+
+@csrf_exempt
+@require_http_methods(["GET", "PUT", "DELETE"])
+@token_required
+def transaction_detail(request, pk):
+    user_id = request.user.id
+
+    try:
+        if request.method == 'PUT':
+            try:
+                dto = services.transaction_dto_from_payload(user_id, _json_body(request))
+            except ValueError as e:
+                return _error(str(e) or 'Invalid JSON', 400)
+            services.update_transaction(pk, dto)
+        elif request.method == 'DELETE':
+            services.delete_transaction(pk, user_id)
+            return FastJsonResponse({'status': 'success'})
+    except Http404:
+        return _error('Transaction not found.', 404)
+
+    row = _transaction_row(user_id, pk)
+    if row is None:
+        return _error('Transaction not found.', 404)
+    return FastJsonResponse({'status': 'success', 'data': row})
+
+
+# ── Read models ────────────────────────────────────────────────
+
+@require_GET
+@token_required
+def dashboard(request):
+    """Totals, goal progress and recent transactions for ?year=&month=."""
+    try:
+        year, month = _month_param(request)
+    except ValueError:
+        return _error(_MONTH_ERROR, 400)
+
+    data = services.get_dashboard_data(request.user.id, year, month)
+    return FastJsonResponse({'status': 'success', 'data': _dashboard_payload(data, year, month)})
+
+
+def _dashboard_payload(data, year, month):
+    return {
+        'year': year,
+        'month': month,
+        'total_income': data['total_income'],
+        'total_expense': data['total_expense'],
+        'balance': data['balance'],
+        'monthly_income': data['monthly_income'],
+        'monthly_expense': data['monthly_expense'],
+        'monthly_balance': data['monthly_balance'],
+        'category_expenses': data['expense_by_category'],
+        'goals': [
+            {k: g[k] for k in ('id', 'category', 'target_amount', 'actual_spent', 'percent', 'status')}
+            for g in data['goals']
+        ],
+        'transactions': [{k: t[k] for k in TRANSACTION_FIELDS} for t in data['recent_transactions']],
+    }
+
+
+@require_GET
+@token_required
+def goals(request):
+    """The user's goals for ?year=&month=."""
+    try:
+        year, month = _month_param(request)
+    except ValueError:
+        return _error(_MONTH_ERROR, 400)
+
+    rows = BudgetGoal.objects.filter(user_id=request.user.id, year=year, month=month)\
+        .order_by('category').values(*GOAL_FIELDS)
+    return FastJsonResponse({'status': 'success', 'data': list(rows)})
+
+
+@require_GET
+@token_required
+def charts(request):
+    """Same series as the charts page; ?start=&end= (YYYY-MM-DD) and ?granularity=."""
+    try:
+        first, last, granularity = _chart_params(request)
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    return FastJsonResponse({'status': 'success', 'data': services.get_chart_data(request.user.id, first, last, granularity)})
+
+
+@require_GET
+@token_required
+def changes(request):
+    """Delta sync, see services.get_changes()."""
+    try:
+        data = services.get_changes(request.user.id, request.GET.get('since') or None)
+    except services.ServiceError as e:
+        return _error(str(e), 400)
+    return FastJsonResponse({'status': 'success', **data})
+
+
+HOME_SECTIONS = ('dashboard', 'goals', 'charts')
+
+
+@require_GET
+@token_required
+def home(request):
+    """
+    Everything the app's first screen needs in one round trip.
+    ?sections=dashboard,goals,charts (default: all) picks the parts; month
+    and chart parameters are those of the single-section endpoints.
+
+    Sections share one data-version read, and goals come out of the same
+    dashboard read model (goals joined with their month's spend), so asking
+    for both costs one build. "timings" holds the milliseconds spent per
+    section, also sent as a Server-Timing header.
+    """
+    sections = [s for s in (request.GET.get('sections') or ','.join(HOME_SECTIONS)).split(',') if s]
+    unknown = set(sections) - set(HOME_SECTIONS)
+    if unknown or not sections:
+        return _error(f"sections must be a comma-separated subset of {', '.join(HOME_SECTIONS)}.", 400)
+    try:
+        year, month = _month_param(request)
+    except ValueError:
+        return _error(_MONTH_ERROR, 400)
+    try:
+        first, last, granularity = _chart_params(request)
+    except ValueError as e:
+        return _error(str(e), 400)
+
+    user_id = request.user.id
+    stamp = services.get_data_version(user_id)
+    data, timings, dashboard = {}, {}, None
+    for section in dict.fromkeys(sections):
+        started = time.perf_counter()
+        if section in ('dashboard', 'goals') and dashboard is None:
+            dashboard = services.get_dashboard_data(user_id, year, month, stamp=stamp)
+        if section == 'dashboard':
+            data[section] = _dashboard_payload(dashboard, year, month)
+        elif section == 'goals':
+            data[section] = [
+                {k: g[k] for k in ('id', 'category', 'category_display', 'target_amount',
+                                   'actual_spent', 'remaining', 'percent', 'status')}
+                for g in dashboard['goals']
+            ]
+        else:
+            data[section] = services.get_chart_data(user_id, first, last, granularity, stamp=stamp)
+        timings[section] = round((time.perf_counter() - started) * 1000, 2)
+
+    response = FastJsonResponse({'status': 'success', 'data': data, 'timings': timings})
+    response['Server-Timing'] = ', '.join(f"{name};dur={ms}" for name, ms in timings.items())
+    return response
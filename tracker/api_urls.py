@@ -0,0 +1,14 @@
+from django.urls import path
+from . import api
+
+# Mounted at /api/v1/ by budget/urls.py
+urlpatterns = [
+    path('token/', api.token, name='api_token'),
+    path('transactions/', api.transactions, name='api_transactions'),
+    path('transactions/<int:pk>/', api.transaction_detail, name='api_transaction_detail'),
+    path('home/', api.home, name='api_home'),
+    path('dashboard/', api.dashboard, name='api_dashboard'),
+    path('goals/', api.goals, name='api_goals'),
+    path('charts/', api.charts, name='api_charts'),
+    path('sync/changes/', api.changes, name='api_changes'),
+]
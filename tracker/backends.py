@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.crypto import salted_hmac
+
+from .models import UserProfile
+
+User = get_user_model()
+
+# Everything but the password hash goes into the shared cache. Cached users
+# come back with password deferred: reading it (check_password, a fallback
+# SECRET_KEY check) loads it from the database, and save() leaves it alone.
+_USER_FIELDS = [f.attname for f in User._meta.concrete_fields if f.attname != 'password']
+_PROFILE_FIELDS = [f.attname for f in UserProfile._meta.concrete_fields]
+
+
+def _cache_key() -> str:
+    # The cached session hash is only valid under the SECRET_KEY it was made
+    # with, so a key rotation moves to fresh entries
+    return 'auth:' + salted_hmac('tracker.backends.cache_key', 'auth').hexdigest()[:12]
+
+
+def _pack(user) -> dict:
+    try:
+        profile = [getattr(user.userprofile, f) for f in _PROFILE_FIELDS]
+    except UserProfile.DoesNotExist:
+        profile = None
+    return {
+        'user': [getattr(user, f) for f in _USER_FIELDS],
+        'profile': profile,
+        'session_hash': user.get_session_auth_hash(),
+    }
+
+
+def _unpack(entry):
+    user = User.from_db(User._default_manager.db, _USER_FIELDS, entry['user'])
+    if entry['profile'] is not None:
+        user.userprofile = UserProfile.from_db(UserProfile._default_manager.db, _PROFILE_FIELDS, entry['profile'])
+    session_hash = entry['session_hash']
+
+    def get_session_auth_hash():
+        # AuthenticationMiddleware checks this on every request; answering
+        # from the cache keeps the deferred password from being loaded for it.
+        # Once the password is on the instance (check_password, set_password)
+        # the hash comes from it, so update_session_auth_hash() after a
+        # password change stores the new one.
+        if 'password' in user.__dict__:
+            return User.get_session_auth_hash(user)
+        return session_hash
+
+    user.get_session_auth_hash = get_session_auth_hash
+    return user
+
+
+def _namespace(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def invalidate_user(user_id):
+    """
+    Drops the cached user + profile on every worker (see signals.py). Waits for
+    the surrounding transaction, or another worker could re-cache the old row
+    under the new stamp before our write is visible.
+    """
+    transaction.on_commit(lambda: cache.bump_stamp(_namespace(user_id)))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend whose per-request get_user() loads the user and profile in a
+    single select_related query and keeps the pair in the versioned cache.
+
+    A cache hit costs one stamp read and no query against auth_user or
+    tracker_userprofile. The password hash itself is never cached, only the
+    session hash derived from it. Any save or delete of either model bumps
+    the stamp, so password changes (session hash), profile and currency
+    updates are seen by every worker on their next request.
+    """
+
+    def get_user(self, user_id):
+        namespace = _namespace(user_id)
+        # Read the stamp once: a save landing between our query and the write
+        # bumps it, so the row we loaded is filed under the old, dead version
+        stamp = cache.get_stamp(namespace)
+        entry = cache.get_versioned(namespace, _cache_key(), stamp=stamp)
+        if entry is not None:
+            user = _unpack(entry)
+        else:
+            user = User._default_manager.select_related('userprofile').filter(pk=user_id).first()
+            if user is None:
+                return None
+            cache.set_versioned(
+                namespace, _cache_key(), _pack(user), getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 3600), stamp=stamp
+            )
+        return user if self.user_can_authenticate(user) else None
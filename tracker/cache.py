@@ -0,0 +1,223 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+
+class TwoTierCache(BaseCache):
+    """
+    Small in-process LRU (L1) in front of a cache shared by every worker (L2).
+
+    Plain keys are read through L1 for at most L1_TIMEOUT seconds, so a delete
+    made by another worker can take that long to show up here. Writes, deletes
+    and incr/decr always go to L2 first and drop the local L1 copy.
+
+    For data that must never be served stale use the versioned helpers: values
+    are stored under "<namespace>:<stamp>:<key>" and the namespace's stamp is
+    never read from L1. Bumping the stamp invalidates every key in the
+    namespace on every worker at once, and because a stamped value never
+    changes, L1 can keep it for as long as the LRU has room.
+
+    That only holds if two bumps can never land on the same stamp, so stamps
+    need an atomic increment. Redis and Memcached have one; DatabaseCache's
+    incr() is a get followed by a set. Against such an L2 set STAMPS to
+    'database' and stamps are kept in the CacheStamp table instead, bumped
+    with an UPDATE ... SET value = value + 1.
+
+    L2 is handed the caller's raw key and version and applies its own
+    KEY_PREFIX; only L1 keys go through this cache's make_key().
+
+    OPTIONS:
+        L2                   alias of the shared cache (default 'shared')
+        STAMPS               'l2' (default) or 'database', see above
+        L1_MAX_ENTRIES       LRU size (default 1000)
+        L1_TIMEOUT           seconds a plain key may live in L1 (default 5)
+        L1_VERSIONED_TIMEOUT seconds a stamped value may live in L1 (default 300)
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l2_alias = options.get('L2', 'shared')
+        self._db_stamps = options.get('STAMPS', 'l2') == 'database'
+        self._l1_max = int(options.get('L1_MAX_ENTRIES', 1000))
+        self._l1_timeout = float(options.get('L1_TIMEOUT', 5))
+        self._l1_versioned_timeout = float(options.get('L1_VERSIONED_TIMEOUT', 300))
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    # ── L1 helpers ────────────────────────────────────────────────
+    # Values are pickled like LocMemCache does, so callers mutating what they
+    # got back can't corrupt the shared copy.
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+        return pickle.loads(payload)
+
+    def _l1_set(self, key, value, ttl):
+        if ttl is not None and ttl <= 0:
+            return
+        payload = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, payload)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def _l1_ttl(self, timeout, cap):
+        if timeout is DEFAULT_TIMEOUT or timeout is None:
+            return cap
+        return min(timeout, cap)
+
+    # ── Cache API ─────────────────────────────────────────────────
+
+    def _v(self, version):
+        return self.version if version is None else version
+
+    def get(self, key, default=None, version=None):
+        k = self.make_and_validate_key(key, version)
+        value = self._l1_get(k)
+        if value is not None:
+            return value
+        value = self.l2.get(key, default, version=self._v(version))
+        if value is not default:
+            self._l1_set(k, value, self._l1_timeout)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        k = self.make_and_validate_key(key, version)
+        self.l2.set(key, value, self._l2_timeout(timeout), version=self._v(version))
+        self._l1_set(k, value, self._l1_ttl(timeout, self._l1_timeout))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        k = self.make_and_validate_key(key, version)
+        added = self.l2.add(key, value, self._l2_timeout(timeout), version=self._v(version))
+        if added:
+            self._l1_set(k, value, self._l1_ttl(timeout, self._l1_timeout))
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.make_and_validate_key(key, version)
+        return self.l2.touch(key, self._l2_timeout(timeout), version=self._v(version))
+
+    def delete(self, key, version=None):
+        k = self.make_and_validate_key(key, version)
+        self._l1_delete(k)
+        return self.l2.delete(key, version=self._v(version))
+
+    def has_key(self, key, version=None):
+        k = self.make_and_validate_key(key, version)
+        return self._l1_get(k) is not None or self.l2.has_key(key, version=self._v(version))
+
+    def incr(self, key, delta=1, version=None):
+        k = self.make_and_validate_key(key, version)
+        self._l1_delete(k)
+        return self.l2.incr(key, delta, version=self._v(version))
+
+    def decr(self, key, delta=1, version=None):
+        return self.incr(key, -delta, version)
+
+    def clear(self):
+        with self._lock:
+            self._l1.clear()
+        self.l2.clear()
+
+    def _l2_timeout(self, timeout):
+        # Let L2 apply its own default when the caller didn't pass one
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    # ── Versioned namespaces ──────────────────────────────────────
+
+    def get_stamp(self, namespace):
+        """Current stamp of namespace, read from L2 (or the database) every time."""
+        if self._db_stamps:
+            return self._db_get_stamp(namespace)
+        key = f"stamp:{namespace}"
+        stamp = self.l2.get(key)
+        if stamp is None:
+            # Seed from the clock so a stamp lost to L2 eviction can never
+            # come back with a value that old entries were written under.
+            self.l2.add(key, time.time_ns() // 1000, None)
+            stamp = self.l2.get(key)
+        return stamp
+
+    def bump_stamp(self, namespace):
+        """Invalidates every versioned key in namespace, on every worker."""
+        if self._db_stamps:
+            return self._db_bump_stamp(namespace)
+        key = f"stamp:{namespace}"
+        try:
+            return self.l2.incr(key)
+        except ValueError:
+            self.l2.add(key, time.time_ns() // 1000, None)
+            return self.l2.get(key)
+
+    def _db_get_stamp(self, namespace):
+        from .models import CacheStamp
+
+        stamp = CacheStamp.objects.filter(namespace=namespace).values_list('value', flat=True).first()
+        if stamp is None:
+            try:
+                with transaction.atomic():
+                    return CacheStamp.objects.create(namespace=namespace, value=time.time_ns() // 1000).value
+            except IntegrityError:
+                # Another worker seeded it first
+                stamp = CacheStamp.objects.filter(namespace=namespace).values_list('value', flat=True).first()
+        return stamp
+
+    def _db_bump_stamp(self, namespace):
+        from .models import CacheStamp
+
+        rows = CacheStamp.objects.filter(namespace=namespace)
+        for _ in range(2):
+            # The UPDATE's row lock is held until the read-back, so every bump
+            # returns a stamp no other bump can also have produced
+            with transaction.atomic():
+                if rows.update(value=F('value') + 1):
+                    return rows.values_list('value', flat=True).first()
+            # Nobody has read this namespace yet, so no value was cached under
+            # any stamp: seeding one is as good as bumping it
+            try:
+                with transaction.atomic():
+                    return CacheStamp.objects.create(namespace=namespace, value=time.time_ns() // 1000).value
+            except IntegrityError:
+                continue  # seeded concurrently: bump on top of it
+
+    def get_versioned(self, namespace, key, default=None, stamp=None):
+        stamp = self.get_stamp(namespace) if stamp is None else stamp
+        raw = f"{namespace}:{stamp}:{key}"
+        k = self.make_and_validate_key(raw)
+        value = self._l1_get(k)
+        if value is not None:
+            return value
+        value = self.l2.get(raw, default, version=self.version)
+        if value is not default:
+            self._l1_set(k, value, self._l1_versioned_timeout)
+        return value
+
+    def set_versioned(self, namespace, key, value, timeout=DEFAULT_TIMEOUT, stamp=None):
+        stamp = self.get_stamp(namespace) if stamp is None else stamp
+        raw = f"{namespace}:{stamp}:{key}"
+        k = self.make_and_validate_key(raw)
+        self.l2.set(raw, value, self._l2_timeout(timeout), version=self.version)
+        self._l1_set(k, value, self._l1_ttl(timeout, self._l1_versioned_timeout))
@@ -196,14 +196,14 @@ class ProfileUpdateForm(forms.ModelForm):
 
 class CustomPasswordResetForm(PasswordResetForm):
     """
-    Custom password reset form using send_async_email (Resend HTTP API)
-    instead of Django's SMTP backend for better reliability on Render.
+    Custom password reset form that queues the email through the outbox
+    (send_async_email) instead of sending over SMTP inside the request.
     """
     def save(self, domain_override=None, subject_template_name='tracker/password_reset_subject.txt',
              email_template_name='tracker/password_reset_email.html', use_https=False, token_generator=None,
              from_email=None, request=None, html_email_template_name=None, extra_email_context=None, **kwargs):
         """
-        Send password reset email via Resend HTTP API instead of SMTP.
+        Queue the password reset email in the outbox instead of sending it inline.
         """
         from django.contrib.auth.tokens import default_token_generator
         from django.contrib.sites.shortcuts import get_current_site
@@ -246,14 +246,13 @@ class CustomPasswordResetForm(PasswordResetForm):
             subject = render_to_string(subject_template_name, context).strip()
             html_content = render_to_string(email_template_name, context)
             
-            # Send via Resend HTTP API
-            logger.info(f"Sending password reset email to {user.email} via Resend HTTP API")
+            # Queue in the outbox — the worker delivers via Resend
             success = send_async_email(user.email, subject, html_content)
             
             if success:
-                logger.info(f"Password reset email sent successfully to {user.email}")
+                logger.info(f"Password reset email queued for {user.email}")
             else:
-                logger.error(f"Failed to send password reset email to {user.email}")
+                logger.error(f"Failed to queue password reset email for {user.email}")
 
 
 class CSVUploadForm(forms.Form):
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.core.handlers.wsgi import WSGIHandler
+from django.utils.module_loading import import_string
+
+# Requests under this path are served by ApiHandler, see budget/wsgi.py
+API_PREFIX = '/api/v1/'
+
+
+class ApiHandler(WSGIHandler):
+    """
+    WSGIHandler whose middleware chain comes from settings.API_MIDDLEWARE
+    instead of MIDDLEWARE. The API authenticates with tokens and answers JSON
+    only, so sessions, CSRF, auth, messages and static files are dead weight
+    on every call. URL resolution is unchanged: the API is mounted in the
+    root URLconf, which also keeps it reachable under runserver and the test
+    client through the full stack.
+    """
+
+    def load_middleware(self, is_async=False):
+        # BaseHandler.load_middleware, minus async adaptation: this handler
+        # only ever runs under WSGI
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = convert_exception_to_response(self._get_response)
+        for middleware_path in reversed(settings.API_MIDDLEWARE):
+            try:
+                mw_instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(mw_instance, 'process_view'):
+                self._view_middleware.insert(0, mw_instance.process_view)
+            if hasattr(mw_instance, 'process_template_response'):
+                self._template_response_middleware.append(mw_instance.process_template_response)
+            if hasattr(mw_instance, 'process_exception'):
+                self._exception_middleware.append(mw_instance.process_exception)
+            handler = convert_exception_to_response(mw_instance)
+
+        self._middleware_chain = handler
@@ -0,0 +1,168 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .ai_services import take_token_usage
+from .models import AIJob, AIUsage
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+# Dedicated pool for outbound model calls. Request threads only insert the
+# AIJob row and return; these threads do the slow network work. Sized small
+# on purpose — it caps how many LLM calls one gunicorn process has in flight.
+_executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'AI_JOB_WORKERS', 2),
+    thread_name_prefix='ai-job',
+)
+
+# Bulkhead on top of the pool: bounds queued + running jobs in this process so
+# a burst of AI requests is refused fast instead of piling up behind the pool.
+_process_slots = threading.BoundedSemaphore(getattr(settings, 'AI_MAX_PENDING_PER_PROCESS', 8))
+
+
+_BUSY_MESSAGE = "The assistant is busy right now. Please try again in a minute."
+
+
+class AIQuotaError(Exception):
+    pass
+
+
+def submit_job(user_id: int, kind: str, func, *args, **kwargs) -> AIJob:
+    """
+    Records a queued job and hands func(*args, **kwargs) to the AI pool once
+    the surrounding transaction commits. func must return a JSON-serialisable
+    result, or None on failure.
+
+    Raises AIQuotaError when the user already has a job pending or the daily
+    quota is used — before anything is recorded — or when the process is at
+    capacity. The process slot is only taken once the job is dispatched, so a
+    rolled-back caller can't leak one; if dispatch finds the process full the
+    job is marked failed and its call refunded.
+    """
+    timeout = getattr(settings, 'AI_JOB_TIMEOUT', 180)
+    with transaction.atomic():
+        # Lock the user's row so concurrent submits from any worker queue up
+        # here: the pending count and the insert below happen as one step.
+        list(User.objects.select_for_update().filter(pk=user_id).values_list('pk', flat=True))
+        pending = AIJob.objects.filter(
+            user_id=user_id,
+            status__in=('queued', 'running'),
+            created_at__gte=timezone.now() - timedelta(seconds=timeout),
+        ).count()
+        if pending >= getattr(settings, 'AI_MAX_PENDING_PER_USER', 1):
+            raise AIQuotaError("You already have an analysis running. Please wait for it to finish.")
+
+        # Both writes roll back together, so a failed insert refunds the call
+        day = _reserve_call(user_id)
+        job = AIJob.objects.create(user_id=user_id, kind=kind)
+
+    dispatched = []
+
+    def dispatch():
+        if not _process_slots.acquire(blocking=False):
+            _finish(job.pk, 'failed', error=_BUSY_MESSAGE)
+            _refund_call(user_id, day)
+            return
+        try:
+            _executor.submit(_run_job, job.pk, user_id, func, args, kwargs)
+        except Exception:
+            _process_slots.release()
+            raise
+        dispatched.append(job.pk)
+
+    transaction.on_commit(dispatch)
+    if not dispatched and not transaction.get_connection().in_atomic_block:
+        # dispatch already ran (no outer transaction) and found no slot
+        raise AIQuotaError(_BUSY_MESSAGE)
+    return job
+
+
+def _reserve_call(user_id: int):
+    """
+    Atomically counts one call against today's quota and returns the day it
+    was charged to. The conditional UPDATE only matches while both counters
+    are under their limits, so concurrent requests from different workers
+    can't overrun the quota.
+    """
+    today = timezone.localdate()
+    try:
+        usage, _ = AIUsage.objects.get_or_create(user_id=user_id, day=today)
+    except IntegrityError:
+        usage = AIUsage.objects.get(user_id=user_id, day=today)
+
+    reserved = AIUsage.objects.filter(
+        pk=usage.pk,
+        calls__lt=getattr(settings, 'AI_DAILY_CALL_QUOTA', 30),
+        tokens__lt=getattr(settings, 'AI_DAILY_TOKEN_QUOTA', 200_000),
+    ).update(calls=F('calls') + 1)
+    if not reserved:
+        raise AIQuotaError("You've reached today's AI limit. It resets at midnight.")
+    return today
+
+
+def _refund_call(user_id: int, day):
+    AIUsage.objects.filter(user_id=user_id, day=day, calls__gt=0).update(calls=F('calls') - 1)
+
+
+def _run_job(job_id, user_id, func, args, kwargs):
+    close_old_connections()
+    take_token_usage()  # discard anything left over from a previous job on this thread
+    try:
+        AIJob.objects.filter(pk=job_id).update(status='running')
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            logger.exception("AI job %s crashed: %s", job_id, e)
+            _finish(job_id, 'failed', error=str(e)[:255])
+            return
+
+        if result is None:
+            _finish(job_id, 'failed', error="The model returned no usable result.")
+        else:
+            _finish(job_id, 'done', result=result)
+    finally:
+        try:
+            tokens = take_token_usage()
+            if tokens:
+                AIUsage.objects.filter(user_id=user_id, day=timezone.localdate()).update(
+                    tokens=F('tokens') + tokens
+                )
+        finally:
+            _process_slots.release()
+            close_old_connections()
+
+
+def _finish(job_id, status, result=None, error=''):
+    AIJob.objects.filter(pk=job_id).update(
+        status=status, result=result, error=error, finished_at=timezone.now()
+    )
+
+
+def get_job(job_id, user_id: int):
+    """
+    Returns the user's job, or None. Jobs still pending past AI_JOB_TIMEOUT
+    are marked failed — their worker process was restarted mid-call and the
+    in-memory pool entry is gone.
+    """
+    try:
+        job = AIJob.objects.filter(pk=job_id, user_id=user_id).first()
+    except (ValueError, ValidationError):
+        return None
+    if job and job.is_pending:
+        timeout = getattr(settings, 'AI_JOB_TIMEOUT', 180)
+        if timezone.now() - job.created_at > timedelta(seconds=timeout):
+            AIJob.objects.filter(pk=job.pk, status__in=('queued', 'running')).update(
+                status='failed',
+                error="The analysis timed out. Please try again.",
+                finished_at=timezone.now(),
+            )
+            job.refresh_from_db()
+    return job
@@ -0,0 +1,321 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, authenticate, get_user_model
+from django.contrib.auth.hashers import check_password, make_password
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import caches
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.http import HttpResponse, JsonResponse
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.text import compress_string
+
+from tracker import otp, services, tokens
+from tracker.handlers import ApiHandler
+from tracker.schemas import LoginDTO
+from tracker.middleware import SessionRefreshMiddleware, brotli
+from tracker.models import Transaction
+from tracker.periods import Period
+from tracker.responses import FastJsonResponse, orjson
+
+
+def _measure(func, iterations, clock=time.perf_counter):
+    """Runs func `iterations` times and returns per-call timings in µs."""
+    timings = []
+    for i in range(iterations):
+        start = clock()
+        func(i)
+        timings.append((clock() - start) * 1_000_000)
+    return timings
+
+
+def _measure_concurrent(func, iterations, workers, clock=time.perf_counter):
+    """
+    _measure() spread over `workers` threads, like requests hitting one
+    process at once. Returns (per-call timings in µs, wall-clock seconds).
+    """
+    def timed(i):
+        start = clock()
+        try:
+            func(i)
+        finally:
+            connection.close()  # each pool thread opens its own
+        return (clock() - start) * 1_000_000
+
+    start = clock()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        timings = list(pool.map(timed, range(iterations)))
+    return timings, clock() - start
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmarks for hot paths. Run against a throwaway database."
+
+    SUITES = ('cache', 'session', 'otp', 'login', 'periods', 'api', 'json', 'compression')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suite', choices=self.SUITES, action='append',
+                            help="Suite to run (repeatable). Defaults to all.")
+        parser.add_argument('--iterations', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help="Threads issuing requests at once in the 'api' suite (default 1).")
+
+    def handle(self, *args, **options):
+        if options['iterations'] < 1:
+            raise CommandError("--iterations must be at least 1.")
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency must be at least 1.")
+        self.concurrency = options['concurrency']
+        for suite in options['suite'] or self.SUITES:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"[{suite}]"))
+            getattr(self, f'bench_{suite}')(options['iterations'])
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f"  {label:<32} median {statistics.median(timings):9.1f} µs   p95 {p95:9.1f} µs"
+        )
+
+    # ── Suites ────────────────────────────────────────────────────
+
+    def bench_cache(self, n):
+        cache = caches['default']
+        if not hasattr(cache, 'l2'):
+            raise CommandError("The 'cache' suite expects 'default' to be tracker.cache.TwoTierCache.")
+
+        run = uuid.uuid4().hex[:8]
+        value = {'total_income': 1234.5, 'total_expense': 678.9, 'categories': list(range(20))}
+        keys = [f"bench:{run}:{i}" for i in range(n)]
+        for k in keys:
+            cache.set(k, value, 300)
+
+        try:
+            # L1: same keys again, still inside L1_TIMEOUT
+            self.report("L1 hit", _measure(lambda i: cache.get(keys[i]), n))
+
+            # L2: drop the local copies so every read goes to the shared cache
+            with cache._lock:
+                cache._l1.clear()
+            self.report("L2 hit (L1 miss)", _measure(lambda i: cache.get(keys[i]), n))
+
+            self.report("miss (both tiers)", _measure(lambda i: cache.get(f"bench:{run}:absent:{i}"), n))
+
+            ns = f"bench:{run}"
+            cache.set_versioned(ns, 'payload', value, 300)
+            self.report("versioned hit (stamp + L1)", _measure(lambda i: cache.get_versioned(ns, 'payload'), n))
+        finally:
+            cache.delete_many(keys)
+
+    def bench_session(self, n):
+        store_cls = import_module(settings.SESSION_ENGINE).SessionStore
+        factory = RequestFactory()
+
+        def view(request):
+            request.session.get('bench')  # what AuthenticationMiddleware does
+            return HttpResponse()
+
+        def run(handler, session_key):
+            def one(i):
+                request = factory.get('/')
+                request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+                handler(request)
+            with CaptureQueriesContext(connection) as ctx:
+                timings = _measure(one, n)
+            writes = sum(
+                1 for q in ctx.captured_queries
+                if 'django_session' in q['sql'] and q['sql'].lstrip().upper().startswith(('UPDATE', 'INSERT'))
+            )
+            return timings, writes
+
+        cases = (
+            ("save every request (before)", SessionMiddleware(view), True),
+            ("refresh middleware (after)", SessionMiddleware(SessionRefreshMiddleware(view)), False),
+        )
+        for label, handler, save_every in cases:
+            session = store_cls()
+            session['bench'] = 1
+            session.create()
+            try:
+                with override_settings(SESSION_SAVE_EVERY_REQUEST=save_every):
+                    timings, writes = run(handler, session.session_key)
+            finally:
+                session.delete()
+            self.report(label, timings)
+            self.stdout.write(f"  {'':<32} {writes * 1000 / n:.0f} session writes per 1,000 requests")
+
+    def bench_otp(self, n):
+        # The password hasher is slow by design; a handful of rounds is enough
+        slow_n = min(n, 20)
+        legacy = make_password('123456')
+        self.report("make_password (before)", _measure(lambda i: make_password('123456'), slow_n))
+        self.report("check_password (before)", _measure(lambda i: check_password('123456', legacy), slow_n))
+
+        digest = otp._digest(otp.PURPOSE_VERIFY, 1, '123456')
+        self.report("HMAC digest (issue)", _measure(lambda i: otp._digest(otp.PURPOSE_VERIFY, 1, '123456'), n))
+        self.report("HMAC digest + compare (verify)", _measure(
+            lambda i: otp.constant_time_compare(digest, otp._digest(otp.PURPOSE_VERIFY, 1, '123456')), n
+        ))
+
+    def bench_login(self, n):
+        # CPU time per attempt; each one runs a full password hash
+        n = min(n, 10)
+        User = get_user_model()
+        username = f"bench-{uuid.uuid4().hex[:8]}"
+        password = uuid.uuid4().hex
+        user = User.objects.create_user(username, password=password)
+
+        def old_failed_attempt(i):
+            # What login_service did before: authenticate(), then check_password() again
+            if authenticate(None, username=username, password='wrong') is None:
+                User.objects.get(username=username).check_password('wrong')
+
+        try:
+            self.report("bad password, old path", _measure(old_failed_attempt, n, time.process_time))
+            for profile, hashers in settings.PASSWORD_HASHER_PROFILES.items():
+                with override_settings(PASSWORD_HASHERS=hashers):
+                    user.set_password(password)
+                    user.save(update_fields=['password'])
+                    for label, dto in (
+                        ("good password", LoginDTO(username=username, password=password)),
+                        ("bad password", LoginDTO(username=username, password='wrong')),
+                        ("unknown user", LoginDTO(username=username + 'x', password='wrong')),
+                    ):
+                        timings = _measure(lambda i: services.login_service(None, dto), n, time.process_time)
+                        self.report(f"{label} [{profile}]", timings)
+        finally:
+            user.delete()
+
+    def bench_periods(self, n):
+        # Plans depend on table size and statistics — run against real data
+        today = timezone.localdate()
+        user_id = Transaction.objects.values_list('user_id', flat=True).first() or 0
+        cases = (
+            ("date__year + date__month (before)", Transaction.objects.filter(
+                user_id=user_id, type='Expense', date__year=today.year, date__month=today.month)),
+            ("Period.month().q() (after)", Transaction.objects.filter(
+                Period.month(today.year, today.month).q(), user_id=user_id, type='Expense')),
+        )
+        for label, qs in cases:
+            qs = qs.values('category').annotate(total=Sum('amount'))
+            self.report(label, _measure(lambda i: list(qs.all()), n))
+            for line in qs.explain().splitlines():
+                self.stdout.write(f"      {line}")
+
+    def _logged_in_user(self, transactions=500):
+        """A throwaway user with some history and a logged-in session; the caller deletes both."""
+        User = get_user_model()
+        user = User.objects.create_user(f"bench-{uuid.uuid4().hex[:8]}", password=uuid.uuid4().hex)
+        today = timezone.localdate()
+        Transaction.objects.bulk_create([
+            Transaction(user=user, amount=10 + i, type='Expense' if i % 3 else 'Income',
+                        category='food' if i % 2 else 'bills', description=f"Purchase #{i}",
+                        date=today - timedelta(days=i % 60))
+            for i in range(transactions)
+        ])
+
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session.update({SESSION_KEY: str(user.pk), BACKEND_SESSION_KEY: settings.AUTHENTICATION_BACKENDS[0],
+                        HASH_SESSION_KEY: user.get_session_auth_hash()})
+        session.create()
+        return user, session
+
+    def bench_api(self, n):
+        # Full request cycle through each handler's middleware chain, for the
+        # same data: dual-mode views with a session cookie vs /api/v1/ with a
+        # bearer token on the trimmed stack
+        user, session = self._logged_in_user()
+        token = tokens.issue_token(user)
+
+        factory = RequestFactory(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        site, api = WSGIHandler(), ApiHandler()
+
+        def site_call(path):
+            def one(i):
+                request = factory.get(path, HTTP_ACCEPT='application/json')
+                request.COOKIES[settings.SESSION_COOKIE_NAME] = session.session_key
+                assert site.get_response(request).status_code == 200
+            return one
+
+        def api_call(path):
+            def one(i):
+                request = factory.get(path, HTTP_AUTHORIZATION=f'Bearer {token}')
+                assert api.get_response(request).status_code == 200
+            return one
+
+        try:
+            for label, site_path, api_path in (
+                ("dashboard", '/dashboard/', '/api/v1/dashboard/'),
+                ("transactions", '/transactions/', '/api/v1/transactions/'),
+            ):
+                for name, call in (("dual-mode (before)", site_call(site_path)),
+                                   ("/api/v1/ (after)", api_call(api_path))):
+                    if self.concurrency == 1:
+                        self.report(f"{label}: {name}", _measure(call, n))
+                        continue
+                    timings, wall = _measure_concurrent(call, n, self.concurrency)
+                    self.report(f"{label}: {name}", timings)
+                    self.stdout.write(f"  {'':<32} {n / wall:9.0f} req/s with {self.concurrency} threads")
+        finally:
+            session.delete()
+            user.delete()
+
+    def bench_json(self, n):
+        # Serialization only: a transactions page as values() returns it
+        today = timezone.localdate()
+        if orjson is None:
+            self.stdout.write("  orjson is not installed; FastJsonResponse is on its stdlib fallback")
+        for size in (1_000, 10_000):
+            rows = [{
+                'id': i, 'date': today - timedelta(days=i % 365), 'type': 'Expense',
+                'category': 'food', 'description': f"Groceries #{i}", 'amount': Decimal(i) / 100,
+            } for i in range(size)]
+            payload = {'status': 'success', 'data': rows}
+            rounds = max(1, min(n, 200_000 // size))
+            self.report(f"{size:,} rows: JsonResponse (before)", _measure(lambda i: JsonResponse(payload), rounds))
+            self.report(f"{size:,} rows: FastJson (after)", _measure(lambda i: FastJsonResponse(payload), rounds))
+
+    def bench_compression(self, n):
+        # Real bodies from the full stack, compressed the way
+        # CompressionMiddleware does it: CPU per response and size ratio
+        user, session = self._logged_in_user()
+        factory = RequestFactory(SERVER_NAME=settings.ALLOWED_HOSTS[0])
+        site = WSGIHandler()
+
+        def body(path, **headers):
+            request = factory.get(path, **headers)
+            request.COOKIES[settings.SESSION_COOKIE_NAME] = session.session_key
+            response = site.get_response(request)
+            assert response.status_code == 200 and not response.has_header('Content-Encoding')
+            return response.content
+
+        codings = [("gzip", lambda data: compress_string(data, max_random_bytes=100))]
+        if brotli is not None:
+            quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+            codings.append(("br", lambda data: brotli.compress(data, mode=brotli.MODE_TEXT, quality=quality)))
+        else:
+            self.stdout.write("  brotli is not installed; gzip only")
+
+        try:
+            for label, data in (
+                ("dashboard HTML", body('/dashboard/')),
+                ("transactions HTML", body('/transactions/')),
+                ("transactions JSON", body('/transactions/', HTTP_ACCEPT='application/json')),
+            ):
+                for coding, compress in codings:
+                    size = len(compress(data))
+                    self.report(f"{label}, {coding}", _measure(lambda i: compress(data), n))
+                    self.stdout.write(f"  {'':<32} {len(data):,} -> {size:,} bytes ({len(data) / size:.1f}x)")
+        finally:
+            session.delete()
+            user.delete()
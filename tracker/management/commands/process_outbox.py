@@ -0,0 +1,34 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tracker.outbox import drain_outbox, purge_finished
+
+
+class Command(BaseCommand):
+    help = "Delivers queued emails from the outbox, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling instead of draining once.")
+        parser.add_argument('--interval', type=float, default=5.0, help="Seconds between polls in --loop mode.")
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        if not options['loop']:
+            sent = drain_outbox(options['batch_size'])
+            self.stdout.write(f"Sent {sent} email(s).")
+            return
+
+        last_purge = 0.0
+        while True:
+            close_old_connections()
+            try:
+                # Keep draining while full batches come back, then sleep
+                while drain_outbox(options['batch_size']) == options['batch_size']:
+                    pass
+                if time.monotonic() - last_purge > 3600:
+                    purge_finished()
+                    last_purge = time.monotonic()
+            except Exception as e:
+                self.stderr.write(f"Outbox drain failed: {e}")
+            time.sleep(options['interval'])
@@ -0,0 +1,146 @@
+import logging
+import re
+import time
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+REFRESH_KEY = '_refreshed_at'
+
+
+class SessionRefreshMiddleware:
+    """
+    Rolling session expiry without a session write on every request.
+
+    SESSION_SAVE_EVERY_REQUEST would UPDATE django_session on every page view
+    and JSON poll. Instead, the session is only re-saved (which also re-issues
+    the cookie with a fresh expiry) when its data changed or when the last
+    refresh is older than SESSION_REFRESH_THRESHOLD — half of
+    SESSION_COOKIE_AGE by default. An active user therefore always has between
+    half and the full cookie age left, and idle sessions still expire.
+
+    Must sit right after SessionMiddleware so its response hook runs first.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SESSION_REFRESH_THRESHOLD', settings.SESSION_COOKIE_AGE // 2)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        session = getattr(request, 'session', None)
+        # Untouched or empty sessions: nothing to keep alive, and reading the
+        # session here would add a needless query and Vary: Cookie
+        if session is None or not session.accessed or session.is_empty() or response.status_code >= 500:
+            return response
+
+        now = int(time.time())
+        if session.modified or now - session.get(REFRESH_KEY, 0) >= self.threshold:
+            # Sets modified, so SessionMiddleware saves and re-sends the cookie
+            session[REFRESH_KEY] = now
+        return response
+
+
+# Dynamic responses worth compressing; images, archives and spreadsheets are
+# already compressed
+_COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson',
+                       'application/javascript', 'application/xml', 'image/svg+xml')
+_CODING = re.compile(r'\s*([a-z*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?', re.I)
+
+
+def _accepted_codings(header: str) -> set:
+    """Codings an Accept-Encoding header allows, i.e. those with q > 0."""
+    accepted = set()
+    for part in header.split(','):
+        match = _CODING.match(part)
+        if not match:
+            continue
+        try:
+            q = float(match.group(2)) if match.group(2) else 1.0
+        except ValueError:
+            continue
+        if q > 0:
+            accepted.add(match.group(1).lower())
+    return accepted
+
+
+class CompressionMiddleware:
+    """
+    Brotli (when the brotli package is installed) or gzip for rendered pages
+    and JSON, negotiated from Accept-Encoding.
+
+    Only buffered responses of at least COMPRESSION_MIN_SIZE bytes are
+    touched. Streaming responses (CSV export, NDJSON feed) pass through:
+    compressing them would hold chunks back in the compressor and defeat
+    incremental delivery. gzip output carries Django's random-length header
+    padding against BREACH-style length probes; brotli has no equivalent, so
+    responses that may reflect request input (a query string or a non-GET
+    body, e.g. the transaction search next to the balances) are only ever
+    gzipped. CSRF tokens are masked per response either way.
+
+    Each compressed response reports its cost and ratio in Server-Timing,
+    e.g. `compress;dur=0.41;desc="br 48213/6120"`, and logs the same at DEBUG
+    level under tracker.middleware.
+
+    Sits near the top of the stack so it sees the final body.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_size = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+        self.brotli_quality = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').lower()
+        if not content_type.startswith(_COMPRESSIBLE_TYPES):
+            return response
+        if len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accepted = _accepted_codings(request.headers.get('Accept-Encoding', ''))
+        reflects_input = bool(request.META.get('QUERY_STRING')) or request.method not in ('GET', 'HEAD')
+        if brotli is not None and 'br' in accepted and not reflects_input:
+            coding = 'br'
+        elif 'gzip' in accepted:
+            coding = 'gzip'
+        else:
+            return response
+
+        started = time.perf_counter()
+        if coding == 'br':
+            compressed = brotli.compress(response.content, mode=brotli.MODE_TEXT, quality=self.brotli_quality)
+        else:
+            compressed = compress_string(response.content, max_random_bytes=100)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        original_size = len(response.content)
+        if len(compressed) >= original_size:
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+
+        # The body now differs byte-wise, so a strong validator must go weak
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+
+        metric = f'compress;dur={elapsed_ms:.2f};desc="{coding} {original_size}/{len(compressed)}"'
+        timing = response.get('Server-Timing')
+        response['Server-Timing'] = f'{timing}, {metric}' if timing else metric
+        logger.debug("Compressed %s with %s: %d -> %d bytes (%.1fx) in %.2f ms", request.path, coding,
+                     original_size, len(compressed), original_size / len(compressed), elapsed_ms)
+        return response
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-19 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0014_ratelimitcounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='code_expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='userprofile',
+            name='verification_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+    ]
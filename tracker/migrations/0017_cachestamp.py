@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0016_change_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheStamp',
+            fields=[
+                ('namespace', models.CharField(max_length=255, primary_key=True, serialize=False)),
+                ('value', models.BigIntegerField()),
+            ],
+        ),
+    ]
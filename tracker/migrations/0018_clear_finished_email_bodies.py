@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+def clear_bodies(apps, schema_editor):
+    # Sent and dead-lettered messages are never delivered again; their bodies
+    # only kept one-time codes and reset links around
+    OutboundEmail = apps.get_model('tracker', 'OutboundEmail')
+    OutboundEmail.objects.filter(status__in=('sent', 'dead')).update(html_content='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tracker', '0017_cachestamp'),
+    ]
+
+    operations = [
+        migrations.RunPython(clear_bodies, migrations.RunPython.noop),
+    ]
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -29,6 +30,9 @@ class Transaction(models.Model):
     type = models.CharField(max_length=10, choices=TYPE_CHOICES)
     date = models.DateField(default=timezone.now, null=False, blank=False)
     description = models.CharField(max_length=255, blank=True, null=True)
+    # Change tracking for delta sync. auto_now doesn't fire on bulk_update or
+    # QuerySet.update(), so those paths must set it themselves.
+    updated_at = models.DateTimeField(auto_now=True)
 
     # every query does a full table scan — slow at any real data volume.
     class Meta:
@@ -37,12 +41,17 @@ class Transaction(models.Model):
             models.Index(fields=['user', 'type'],       name='txn_user_type_idx'),
             models.Index(fields=['user', 'category'],   name='txn_user_cat_idx'),
             models.Index(fields=['user', 'type', 'date'], name='txn_user_type_date_idx'),
+            models.Index(fields=['user', 'updated_at'], name='txn_user_updated_idx'),
         ]
 
     def save(self, *args, **kwargs):
+        self.normalize()
+        super().save(*args, **kwargs)
+
+    def normalize(self):
+        """Stores a blank description as NULL. bulk_create/bulk_update skip save(), so call it there."""
         if not self.description:
             self.description = None
-        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.type} - {self.category} ({self.description or 'No Description'})"
@@ -61,23 +70,53 @@ class BudgetGoal(models.Model):
     month = models.IntegerField()
     year = models.IntegerField()
     created_at = models.DateField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('user', 'category', 'month', 'year')
         indexes = [
             # speeds up the dashboard goal-progress lookup
             models.Index(fields=['user', 'month', 'year']),
+            models.Index(fields=['user', 'updated_at'], name='goal_user_updated_idx'),
         ]
 
     def __str__(self):
         return f"{self.user.username}'s goal for {self.category} ({self.month}/{self.year})"
 
 
+class Tombstone(models.Model):
+    """
+    Marks a deleted transaction or goal so delta sync can tell clients to
+    drop it. Written by every delete path in services.py; rows older than
+    SYNC_TOMBSTONE_DAYS are pruned, and clients that far behind resync fully.
+    """
+    KIND_CHOICES = [
+        ('transaction', 'Transaction'),
+        ('goal', 'Budget Goal'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.kind} {self.object_id}"
+
+
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='userprofile')
     currency_code = models.CharField(max_length=3, default='NGN', verbose_name='Preferred Currency')
 
+    # HMAC digest of the pending code, see tracker/otp.py
     email_verification_code = models.CharField(max_length=128, null=True, blank=True)
+    code_expires_at = models.DateTimeField(null=True, blank=True)
+    verification_attempts = models.PositiveSmallIntegerField(default=0)
     pending_email = models.EmailField(null=True, blank=True)
     code_generated_at = models.DateTimeField(null=True, blank=True)
     last_email_change = models.DateTimeField(null=True, blank=True)
@@ -94,4 +133,122 @@ class BudgetLock(models.Model):
     year = models.IntegerField()
 
     class Meta:
-        unique_together = ('user', 'month', 'year')
\ No newline at end of file
+        unique_together = ('user', 'month', 'year')
+
+
+class AIJob(models.Model):
+    """
+    A model call run off the request thread. The page gets the job id back
+    immediately and polls for the result, so slow LLM calls never hold a
+    gunicorn thread.
+    """
+    KIND_CHOICES = [
+        ('audit', 'Spend Audit'),
+        ('receipt', 'Receipt Scan'),
+    ]
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    result = models.JSONField(null=True, blank=True)
+    error = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'status']),
+        ]
+
+    @property
+    def is_pending(self):
+        return self.status in ('queued', 'running')
+
+    def __str__(self):
+        return f"{self.get_kind_display()} job {self.id} ({self.status})"
+
+
+
+class AIUsage(models.Model):
+    """Per-user daily AI call and token counters, bumped with F() updates."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateField()
+    calls = models.IntegerField(default=0)
+    tokens = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('user', 'day')
+
+    def __str__(self):
+        return f"{self.user.username} AI usage on {self.day}: {self.calls} calls, {self.tokens} tokens"
+
+
+
+class OutboundEmail(models.Model):
+    """
+    Email outbox. Requests only insert a row; the outbox worker delivers it,
+    retrying with backoff and parking it as 'dead' after too many failures.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('dead', 'Dead'),
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    html_content = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    # When the row may next be picked up. While 'sending' it doubles as the
+    # claim's lease expiry, so a crashed worker's rows are retried later.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} → {self.to_email} ({self.status})"
+
+
+
+class RateLimitCounter(models.Model):
+    """
+    Hit counter for one rate-limit key in one fixed time window. Shared by all
+    gunicorn workers, and only ever changed with atomic UPDATE ... count + 1.
+    """
+    key = models.CharField(max_length=255)
+    window = models.BigIntegerField()
+    count = models.IntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        unique_together = ('key', 'window')
+
+    def __str__(self):
+        return f"{self.key} @ {self.window}: {self.count}"
+
+
+class CacheStamp(models.Model):
+    """
+    Version counter of one cache namespace (tracker/cache.py), for shared
+    caches without an atomic incr. Only ever changed with UPDATE ... + 1.
+    """
+    namespace = models.CharField(max_length=255, primary_key=True)
+    value = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.namespace}: {self.value}"
@@ -0,0 +1,83 @@
+import logging
+from datetime import timedelta
+from django.conf import settings
+from django.contrib.auth.hashers import check_password
+from django.db.models import F
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare, get_random_string, salted_hmac
+
+from .models import UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Marks codes stored by this module; anything else is a legacy PBKDF2 hash
+OTP_PREFIX = 'hmac$'
+
+# Purposes bind a digest to one flow, so a code mailed for an email change
+# can't be replayed against account verification (and vice versa)
+PURPOSE_VERIFY = 'verify'
+PURPOSE_EMAIL_CHANGE = 'email-change'
+
+
+def _digest(purpose: str, user_id: int, code: str) -> str:
+    # Six digits only have 10^6 values, so a slow hash buys nothing against
+    # someone holding the database — the secret key and the attempt limit
+    # below are what keep the code safe. HMAC-SHA256 verifies in microseconds.
+    return salted_hmac(
+        f'tracker.otp.{purpose}', f'{user_id}:{code}', algorithm='sha256'
+    ).hexdigest()
+
+
+def issue_code(profile: UserProfile, purpose: str) -> str:
+    """
+    Generates a new 6-digit code, stores its digest on profile and resets the
+    attempt counter. Returns the raw code for the email; the caller saves.
+    """
+    raw_code = get_random_string(6, allowed_chars='0123456789')
+    profile.email_verification_code = OTP_PREFIX + _digest(purpose, profile.user_id, raw_code)
+    profile.code_expires_at = timezone.now() + timedelta(seconds=getattr(settings, 'OTP_TTL', 600))
+    profile.verification_attempts = 0
+    return raw_code
+
+
+def clear_code(profile: UserProfile):
+    """Forgets the pending code after a successful check; the caller saves."""
+    profile.email_verification_code = None
+    profile.code_expires_at = None
+    profile.verification_attempts = 0
+
+
+def check_code(profile: UserProfile, purpose: str, code: str):
+    """
+    Returns (True, None) when code matches the profile's pending code, else
+    (False, message). Every check spends one attempt up front with a
+    conditional UPDATE, so parallel guesses can't exceed OTP_MAX_ATTEMPTS.
+    """
+    stored = profile.email_verification_code
+    if not stored:
+        return False, "No verification pending."
+
+    expires_at = profile.code_expires_at
+    if expires_at is None and profile.code_generated_at:
+        # Legacy PBKDF2 codes predate code_expires_at
+        expires_at = profile.code_generated_at + timedelta(seconds=getattr(settings, 'OTP_TTL', 600))
+    if expires_at is None or timezone.now() > expires_at:
+        return False, "This code has expired. Please request a new one."
+
+    spent = UserProfile.objects.filter(
+        pk=profile.pk,
+        verification_attempts__lt=getattr(settings, 'OTP_MAX_ATTEMPTS', 5),
+    ).update(verification_attempts=F('verification_attempts') + 1)
+    if not spent:
+        return False, "Too many incorrect attempts. Please request a new code."
+
+    code = (code or '').strip()
+    if stored.startswith(OTP_PREFIX):
+        ok = constant_time_compare(stored[len(OTP_PREFIX):], _digest(purpose, profile.user_id, code))
+    else:
+        # Issued before the switch to HMAC digests; expiry checked above
+        ok = check_password(code, stored)
+
+    if not ok:
+        return False, "Invalid verification code."
+    return True, None
@@ -0,0 +1,114 @@
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+from .utils import deliver_email
+
+logger = logging.getLogger(__name__)
+
+# Single background thread that drains the outbox right after a request
+# queues mail, so first delivery doesn't wait for the worker's next poll.
+# The process_outbox command remains the durable path for retries.
+_nudger = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-outbox')
+
+
+def enqueue_email(to_email: str, subject: str, html_content: str) -> OutboundEmail:
+    msg = OutboundEmail.objects.create(
+        to_email=to_email,
+        subject=subject[:255],
+        html_content=html_content,
+    )
+    if getattr(settings, 'EMAIL_OUTBOX_NUDGE', True):
+        transaction.on_commit(lambda: _nudger.submit(_drain_in_background))
+    return msg
+
+
+def _drain_in_background():
+    close_old_connections()
+    try:
+        drain_outbox()
+    except Exception as e:
+        logger.exception("Background outbox drain failed: %s", e)
+    finally:
+        close_old_connections()
+
+
+def drain_outbox(batch_size: int = 50) -> int:
+    """
+    Delivers up to batch_size due messages and returns how many were sent.
+
+    Each row is claimed with a conditional UPDATE before sending, so several
+    workers (or the nudger and the command) can drain concurrently without
+    double-sending. The claim leases the row for EMAIL_OUTBOX_LEASE seconds.
+    """
+    now = timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE', 120))
+    due = list(
+        OutboundEmail.objects
+        .filter(status__in=('pending', 'sending'), next_attempt_at__lte=now)
+        .order_by('next_attempt_at')[:batch_size]
+    )
+
+    sent = 0
+    for msg in due:
+        claimed = OutboundEmail.objects.filter(
+            pk=msg.pk, status__in=('pending', 'sending'), next_attempt_at__lte=now
+        ).update(status='sending', next_attempt_at=timezone.now() + lease)
+        if not claimed:
+            continue
+
+        try:
+            deliver_email(msg.to_email, msg.subject, msg.html_content)
+        except Exception as e:
+            _schedule_retry(msg, e)
+            continue
+
+        # The body carries one-time codes and reset links; drop it once
+        # it has been handed off
+        OutboundEmail.objects.filter(pk=msg.pk).update(
+            status='sent', sent_at=timezone.now(), attempts=F('attempts') + 1, last_error='', html_content=''
+        )
+        sent += 1
+
+    return sent
+
+
+def _schedule_retry(msg: OutboundEmail, error: Exception):
+    attempts = msg.attempts + 1
+    max_attempts = getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 6)
+
+    if attempts >= max_attempts:
+        logger.error("Email %s to %s dead-lettered after %d attempts: %s",
+                     msg.pk, msg.to_email, attempts, error)
+        # Never retried from here on, so the body's secrets go too
+        OutboundEmail.objects.filter(pk=msg.pk).update(
+            status='dead', attempts=attempts, last_error=str(error)[:255], html_content=''
+        )
+        return
+
+    # Exponential backoff with jitter: ~30s, 1m, 2m, 4m, ... capped at an hour
+    base = getattr(settings, 'EMAIL_OUTBOX_BACKOFF', 30)
+    delay = min(base * (2 ** (attempts - 1)), 3600) * random.uniform(0.8, 1.2)
+    logger.warning("Email %s to %s failed (attempt %d), retrying in %ds: %s",
+                   msg.pk, msg.to_email, attempts, delay, error)
+    OutboundEmail.objects.filter(pk=msg.pk).update(
+        status='pending',
+        attempts=attempts,
+        next_attempt_at=timezone.now() + timedelta(seconds=delay),
+        last_error=str(error)[:255],
+    )
+
+
+def purge_finished(older_than_days: int = 7) -> int:
+    """Deletes sent and dead-lettered rows older than older_than_days."""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = OutboundEmail.objects.filter(
+        Q(status='sent', sent_at__lt=cutoff) | Q(status='dead', created_at__lt=cutoff)
+    ).delete()
+    return deleted
@@ -0,0 +1,74 @@
+import datetime as dt
+from dataclasses import dataclass
+from django.db.models import Q
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek
+
+
+# Database truncation per chart granularity; weeks start on Monday
+TRUNC = {'day': TruncDay, 'week': TruncWeek, 'month': TruncMonth}
+
+
+def truncate(day: dt.date, granularity: str) -> dt.date:
+    """Python twin of TRUNC, for lining up buckets with the database."""
+    if granularity == 'week':
+        return day - dt.timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_starts(first: dt.date, last: dt.date, granularity: str):
+    """Every bucket start from the one holding first to the one holding last."""
+    current, last = truncate(first, granularity), truncate(last, granularity)
+    while current <= last:
+        yield current
+        if granularity == 'month':
+            current = Period.month(current.year, current.month).end
+        else:
+            current += dt.timedelta(days=7 if granularity == 'week' else 1)
+
+
+@dataclass(frozen=True)
+class Period:
+    """
+    Half-open date range [start, end). Filtering with .q() compiles to
+    `date >= start AND date < end`, a plain range over the column that the
+    (user, date) and (user, type, date) indexes can seek into — unlike
+    date__month / date__year, which wrap the column in EXTRACT/strftime.
+    """
+    start: dt.date
+    end: dt.date
+
+    @classmethod
+    def month(cls, year: int, month: int) -> 'Period':
+        start = dt.date(year, month, 1)
+        end = dt.date(year + 1, 1, 1) if month == 12 else dt.date(year, month + 1, 1)
+        return cls(start, end)
+
+    @classmethod
+    def quarter(cls, year: int, quarter: int) -> 'Period':
+        if not 1 <= quarter <= 4:
+            raise ValueError("quarter must be in 1..4")
+        first_month = 3 * (quarter - 1) + 1
+        return cls(cls.month(year, first_month).start, cls.month(year, first_month + 2).end)
+
+    @classmethod
+    def year(cls, year: int) -> 'Period':
+        return cls(dt.date(year, 1, 1), dt.date(year + 1, 1, 1))
+
+    @classmethod
+    def custom(cls, first: dt.date, last: dt.date) -> 'Period':
+        """From first to last inclusive, as users pick dates. Empty if last < first."""
+        end = dt.date.max if last == dt.date.max else last + dt.timedelta(days=1)
+        return cls(first, max(first, end))
+
+    @property
+    def last(self) -> dt.date:
+        """Last day inside the period."""
+        return self.end - dt.timedelta(days=1)
+
+    def q(self, field: str = 'date') -> Q:
+        return Q(**{f'{field}__gte': self.start, f'{field}__lt': self.end})
+
+    def __contains__(self, day: dt.date) -> bool:
+        return self.start <= day < self.end
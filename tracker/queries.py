@@ -0,0 +1,41 @@
+from datetime import datetime
+
+from .models import Transaction
+from .periods import Period
+
+
+def filter_transactions(request, user):
+    """
+    The user's transactions narrowed by the list filters in request.GET
+    (q, category, start_date, end_date), newest first. Shared by the list,
+    the export and the API so all three agree on what "the current view"
+    means. Returns (queryset, filters) with the values as the template shows
+    them.
+    """
+    qs = Transaction.objects.filter(user=user).order_by('-date', '-id')
+
+    query = request.GET.get('q')
+    category_filter = request.GET.get('category')
+    start_date = request.GET.get('start_date')
+    end_date = request.GET.get('end_date')
+
+    if query:
+        qs = qs.filter(description__icontains=query)
+
+    if category_filter and category_filter != 'All':
+        qs = qs.filter(category=category_filter)
+
+    if start_date:
+        try:
+            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
+            if end_date:
+                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
+            else:
+                # Default to today so a "from" date always gives a full range
+                end_date_obj = datetime.today().date()
+                end_date = end_date_obj.strftime('%Y-%m-%d')
+            qs = qs.filter(Period.custom(start_date_obj, end_date_obj).q())
+        except ValueError:
+            pass
+
+    return qs, {'query': query, 'category': category_filter, 'start_date': start_date, 'end_date': end_date}
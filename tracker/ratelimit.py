@@ -1,5 +1,15 @@
+import hashlib
 import logging
-from django.core.cache import cache
+import random
+import time
+from datetime import timedelta
+from functools import lru_cache
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
 
 logger = logging.getLogger(__name__)
 
@@ -8,34 +18,159 @@ class RateLimitError(Exception):
     pass
 
 
+class DatabaseBackend:
+    """
+    Counters in the RateLimitCounter table. Every worker shares the same rows
+    and increments are a single UPDATE ... SET count = count + 1, so limits
+    hold across processes without extra infrastructure.
+    """
+
+    def hit(self, key: str, window: int, ttl: int) -> int:
+        from .models import RateLimitCounter
+
+        rows = RateLimitCounter.objects.filter(key=key, window=window)
+        if count := self._increment(rows):
+            return count
+        try:
+            with transaction.atomic():
+                RateLimitCounter.objects.create(
+                    key=key, window=window, count=1,
+                    expires_at=timezone.now() + timedelta(seconds=ttl),
+                )
+            self._maybe_prune()
+            return 1
+        except IntegrityError:
+            # Another worker created the row first — count on top of it
+            return self._increment(rows) or 1
+
+    def _increment(self, rows) -> int:
+        """
+        Adds one hit and returns the new count, or 0 if the row is missing.
+        The UPDATE's row lock is held until the transaction ends, so the count
+        read back is the one this hit produced, not one a parallel hit has
+        already moved past.
+        """
+        with transaction.atomic():
+            if not rows.update(count=F('count') + 1):
+                return 0
+            return rows.values_list('count', flat=True).first()
+
+    def count(self, key: str, window: int) -> int:
+        from .models import RateLimitCounter
+        return RateLimitCounter.objects.filter(key=key, window=window).values_list('count', flat=True).first() or 0
+
+    def reset(self, key: str, windows) -> None:
+        from .models import RateLimitCounter
+        RateLimitCounter.objects.filter(key=key, window__in=list(windows)).delete()
+
+    def _maybe_prune(self):
+        # Expired windows are only ever read as "previous", so cleaning up on
+        # a small fraction of new-window inserts keeps the table tiny.
+        if random.random() < 0.05:
+            from .models import RateLimitCounter
+            RateLimitCounter.objects.filter(expires_at__lt=timezone.now()).delete()
+
+
+class CacheBackend:
+    """
+    Counters in a Django cache via add() + incr(). Only use a cache whose
+    incr is atomic and shared by all workers — Redis or Memcached in
+    production. LocMemCache is atomic too but per-process, which makes it a
+    local stand-in for development and tests.
+    """
+
+    def __init__(self, alias: str = None):
+        self.alias = alias or getattr(settings, 'RATELIMIT_CACHE_ALIAS', 'default')
+
+    def hit(self, key: str, window: int, ttl: int) -> int:
+        cache = caches[self.alias]
+        k = f"{key}:{window}"
+        if cache.add(k, 1, timeout=ttl):
+            return 1
+        try:
+            return cache.incr(k)
+        except ValueError:
+            # Key expired between add() and incr()
+            cache.add(k, 1, timeout=ttl)
+            return 1
+
+    def count(self, key: str, window: int) -> int:
+        return caches[self.alias].get(f"{key}:{window}", 0)
+
+    def reset(self, key: str, windows) -> None:
+        caches[self.alias].delete_many([f"{key}:{w}" for w in windows])
+
+
+@lru_cache(maxsize=None)
+def _get_backend(path: str):
+    return import_string(path)()
+
+
+def get_backend():
+    return _get_backend(getattr(settings, 'RATELIMIT_BACKEND', 'tracker.ratelimit.DatabaseBackend'))
+
+
+def _key(key_prefix: str) -> str:
+    key = f"ratelimit:{key_prefix}"
+    if len(key) > 200:
+        key = "ratelimit:" + hashlib.sha256(key_prefix.encode()).hexdigest()
+    return key
+
+
+def _sliding_count(backend, key: str, period: int, current: int = None) -> float:
+    """
+    Sliding-window estimate: this window's hits plus the previous window's
+    hits weighted by how much of it still overlaps the last `period` seconds.
+    """
+    now = time.time()
+    window = int(now // period)
+    if current is None:
+        current = backend.count(key, window)
+    previous = backend.count(key, window - 1)
+    overlap = 1 - (now % period) / period
+    return previous * overlap + current
+
+
 def check_ratelimit(key_prefix: str, limit: int = 5, period: int = 60) -> bool:
     """
-    Lightweight rate limiter using Django's cache backend.
+    Sliding-window rate limiter over a backend shared by all workers.
+    The hit is counted atomically *before* the limit is checked, so parallel
+    requests can't all slip through on the same stale read.
     RateLimitError is intentionally NOT caught here — callers must handle it.
-    Only genuine cache backend failures are caught and logged.
+    Only genuine backend failures are caught and logged.
     """
-    key = f"ratelimit:{key_prefix}"
+    key = _key(key_prefix)
 
     try:
-        current = cache.get(key)
+        backend = get_backend()
+        window = int(time.time() // period)
+        current = backend.hit(key, window, ttl=2 * period)
+        estimated = _sliding_count(backend, key, period, current=current)
 
-        if current is None:
-            cache.set(key, 1, timeout=period)
-            return True
+    except Exception as e:
+        # Only real backend errors land here (DB locked, Redis down, etc.)
+        logger.error("Rate limiter backend error (key=%s): %s", key, e)
+        # Fail open: let the request through rather than locking everyone out
+        return True
 
-        if current >= limit:
-            # Raise BEFORE the except — so it propagates to the caller
-            raise RateLimitError("Too many attempts. Please try again later.")
+    if estimated > limit:
+        raise RateLimitError("Too many attempts. Please try again later.")
+    return True
 
-        cache.incr(key)
-        return True
 
-    except RateLimitError:
-        # Re-raise — never swallow this, it's intentional flow control
-        raise
+def get_ratelimit_usage(key_prefix: str, period: int = 60) -> int:
+    """Hits counted against key_prefix over the last `period` seconds."""
+    try:
+        return int(_sliding_count(get_backend(), _key(key_prefix), period))
+    except Exception as e:
+        logger.error("Rate limiter backend error (key=%s): %s", key_prefix, e)
+        return 0
+
 
+def reset_ratelimit(key_prefix: str, period: int = 60) -> None:
+    """Clears the counters for key_prefix, e.g. after a successful login."""
+    window = int(time.time() // period)
+    try:
+        get_backend().reset(_key(key_prefix), [window - 1, window])
     except Exception as e:
-        # Only real cache errors land here (Redis down, serialisation error, etc.)
-        logger.error("Cache backend error in rate limiter (key=%s): %s", key, e)
-        # Fail open: let the request through rather than locking everyone out
-        return True
\ No newline at end of file
+        logger.error("Rate limiter backend error (key=%s): %s", key_prefix, e)
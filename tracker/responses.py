@@ -0,0 +1,63 @@
+import json
+import datetime as dt
+from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse
+from django.utils.duration import duration_iso_string
+from django.utils.functional import Promise
+
+try:
+    import orjson
+except ImportError:  # Optional: falls back to the stdlib encoder
+    orjson = None
+
+
+def _default(obj):
+    """
+    What orjson can't (or, for subclasses, shouldn't) encode natively, turned
+    into what DjangoJSONEncoder would have emitted. Subclasses come through
+    here because of OPT_PASSTHROUGH_SUBCLASS: form ErrorLists keep their items
+    off the underlying list, so orjson's native path would write [].
+    """
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, Promise):
+        return str(obj)
+    if isinstance(obj, dict):
+        return dict(obj)
+    if isinstance(obj, (list, tuple)):
+        return list(obj)
+    if isinstance(obj, str):
+        # str() hands a SafeString back unchanged
+        return str.__str__(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, dt.timedelta):
+        return duration_iso_string(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _OPTIONS = orjson.OPT_PASSTHROUGH_SUBCLASS | orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+    def dumps(data) -> bytes:
+        return orjson.dumps(data, default=_default, option=_OPTIONS)
+else:
+    def dumps(data) -> bytes:
+        return json.dumps(data, cls=DjangoJSONEncoder, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+class FastJsonResponse(HttpResponse):
+    """
+    Drop-in for JsonResponse, serialized with orjson when it is installed.
+    Decimals become strings, as with DjangoJSONEncoder; dates and datetimes
+    are ISO 8601 (UTC as "Z", full microsecond precision).
+    """
+
+    def __init__(self, data, safe=True, **kwargs):
+        if safe and not isinstance(data, dict):
+            raise TypeError(
+                'In order to allow non-dict objects to be serialized set the safe parameter to False.'
+            )
+        kwargs.setdefault('content_type', 'application/json')
+        super().__init__(content=dumps(data), **kwargs)
@@ -99,17 +99,19 @@ class TransactionDTO:
                 self.amount = Decimal(str(self.amount))
             except Exception:
                 raise ValueError("Invalid amount.")
+        if not self.amount.is_finite():
+            raise ValueError("Invalid amount.")
         if self.amount <= 0:
             raise ValueError("Amount must be greater than zero.")
         if self.amount > Decimal('999999999.99'):
             raise ValueError("Amount is unrealistically large.")
 
         # Type
-        if self.transaction_type not in self.VALID_TYPES:
+        if not isinstance(self.transaction_type, str) or self.transaction_type not in self.VALID_TYPES:
             raise ValueError(f"Invalid transaction type. Must be Income or Expense.")
 
         # Category
-        if self.category not in self.VALID_CATEGORIES:
+        if not isinstance(self.category, str) or self.category not in self.VALID_CATEGORIES:
             raise ValueError(f"Invalid category.")
 
         # Date
@@ -124,6 +126,8 @@ class TransactionDTO:
             raise ValueError("Invalid date format.")
 
         # Description — strip, cap length, no script tags
+        if self.description is not None and not isinstance(self.description, str):
+            raise ValueError("Description must be text.")
         desc = (self.description or '').strip()
         desc = desc[:255]  # enforce DB max_length
         self.description = desc  # empty string = no description, template handles display
@@ -4,18 +4,25 @@ import csv
 import io
 import json
 import re
+import threading
+import time
 import datetime as dt
+from decimal import Decimal
 from pathlib import Path
 from datetime import timedelta
 from django.conf import settings
-from django.contrib.auth import get_user_model, authenticate
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Q, Sum
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
-from django.utils.crypto import get_random_string
 
-from .models import UserProfile, Transaction, BudgetGoal
+from . import otp
+from .models import UserProfile, Transaction, BudgetGoal, BudgetLock, Tombstone
+from .periods import TRUNC, Period, bucket_starts
 from .schemas import *
 
 User = get_user_model()
@@ -29,6 +36,28 @@ except FileNotFoundError:
     logger.warning("categorize_prompt.txt not found at %s. AI categorization will be limited.", _PROMPT_PATH)
     _PROMPT_TEMPLATE = None
 
+# The template is static text around a single {descriptions} slot. The part
+# before the slot is registered with Gemini's context cache so each import call
+# only ships the description list; the closing instructions ride along as the
+# cached system instruction.
+if _PROMPT_TEMPLATE:
+    _prefix, _, _suffix = _PROMPT_TEMPLATE.partition('{descriptions}')
+    _PROMPT_PREFIX = _prefix.replace('{{', '{').replace('}}', '}')
+    _PROMPT_SUFFIX = _suffix.replace('{{', '{').replace('}}', '}').strip()
+else:
+    _PROMPT_PREFIX = _PROMPT_SUFFIX = None
+
+# Context caching needs a pinned model version, not the floating alias
+_CATEGORIZE_MODEL = 'gemini-2.0-flash-001'
+
+# One cached prefix per process. expires_at is refreshed a minute before the
+# provider-side TTL; retry_at backs off after a failed create so we don't pay a
+# failing round trip on every import (forever, if the prompt is too small to be
+# cached at all). creating marks a create in flight: other callers go inline
+# meanwhile instead of queueing behind the network call.
+_prompt_cache = {'name': None, 'expires_at': 0.0, 'retry_at': 0.0, 'creating': False}
+_prompt_cache_lock = threading.Lock()
+
 
 class ServiceError(Exception):
     pass
@@ -60,8 +89,7 @@ def register_user(dto):
             existing_user.last_name = dto.last_name
             existing_user.save()
 
-            raw_code = get_random_string(6, allowed_chars='0123456789')
-            profile.email_verification_code = make_password(raw_code)
+            raw_code = otp.issue_code(profile, otp.PURPOSE_VERIFY)
             profile.code_generated_at = timezone.now()
             profile.save()
 
@@ -82,8 +110,7 @@ def register_user(dto):
 
         profile, _ = UserProfile.objects.get_or_create(user=user)
 
-        raw_code = get_random_string(6, allowed_chars='0123456789')
-        profile.email_verification_code = make_password(raw_code)
+        raw_code = otp.issue_code(profile, otp.PURPOSE_VERIFY)
         profile.code_generated_at = timezone.now()
         profile.save()
 
@@ -91,18 +118,30 @@ def register_user(dto):
 
 
 def login_service(request, data: LoginDTO):
-    user = authenticate(request, username=data.username, password=data.password)
-    if user:
-        return user, "success"
-
+    """
+    Resolves the user once and runs the password hasher exactly once, whatever
+    the outcome — authenticate() followed by a second check_password() doubled
+    the CPU cost of every bad attempt. check_password() also upgrades hashes
+    made by an older PASSWORD_HASHERS entry on success.
+    """
     try:
-        potential_user = User.objects.get(username=data.username)
-        if potential_user.check_password(data.password) and not potential_user.is_active:
-            return potential_user, "unverified"
+        user = User._default_manager.get_by_natural_key(data.username)
     except User.DoesNotExist:
-        pass
+        # Hash anyway so response time doesn't reveal which usernames exist
+        make_password(data.password)
+        user_login_failed.send(sender=__name__, credentials={'username': data.username}, request=request)
+        return None, "invalid"
+
+    if not user.check_password(data.password):
+        user_login_failed.send(sender=__name__, credentials={'username': data.username}, request=request)
+        return None, "invalid"
+
+    if not user.is_active:
+        return user, "unverified"
 
-    return None, "invalid"
+    # What authenticate() would have attached; login() needs it
+    user.backend = settings.AUTHENTICATION_BACKENDS[0]
+    return user, "success"
 
 
 def verify_code(data: VerifyCodeDTO, acting_user_id: int = None):
@@ -115,13 +154,14 @@ def verify_code(data: VerifyCodeDTO, acting_user_id: int = None):
 
         if not profile.email_verification_code:
             raise ServiceError("No verification pending.")
-        if not check_password(data.code, profile.email_verification_code):
-            return False, "Invalid verification code."
+        ok, error = otp.check_code(profile, otp.PURPOSE_VERIFY, data.code)
+        if not ok:
+            return False, error
 
         user.is_active = True
         user.save()
 
-        profile.email_verification_code = None
+        otp.clear_code(profile)
         profile.resend_count = 0
         profile.cooldown_until = None
         profile.save()
@@ -144,8 +184,7 @@ def resend_code(data: ResendCodeDTO):
         next_cooldown = 1 if profile.resend_count <= 3 else 5 * (2 ** (profile.resend_count - 4))
         profile.cooldown_until = timezone.now() + timedelta(minutes=min(next_cooldown, 1440))
 
-        raw_code = get_random_string(6, allowed_chars='0123456789')
-        profile.email_verification_code = make_password(raw_code)
+        raw_code = otp.issue_code(profile, otp.PURPOSE_VERIFY)
         profile.save()
 
         return True, raw_code, user.email
@@ -171,8 +210,7 @@ def request_email_change(dto: EmailChangeRequestDTO):
     profile.resend_count = 1
     profile.cooldown_until = timezone.now() + timedelta(minutes=1)
 
-    raw_code = get_random_string(6, allowed_chars='0123456789')
-    profile.email_verification_code = make_password(raw_code)
+    raw_code = otp.issue_code(profile, otp.PURPOSE_EMAIL_CHANGE)
     profile.save()
 
     return raw_code
@@ -187,14 +225,15 @@ def verify_email_change(data: VerifyEmailChangeDTO):
 
     if not profile.pending_email or not profile.email_verification_code:
         return False, "No active email change request found."
-    if not check_password(data.code, profile.email_verification_code):
-        return False, "Invalid verification code."
+    ok, error = otp.check_code(profile, otp.PURPOSE_EMAIL_CHANGE, data.code)
+    if not ok:
+        return False, error
 
     user.email = profile.pending_email
     user.save()
 
     profile.last_email_change = timezone.now()
-    profile.email_verification_code = None
+    otp.clear_code(profile)
     profile.pending_email = None
     profile.resend_count = 0
     profile.cooldown_until = None
@@ -241,15 +280,44 @@ def resend_email_change_code(user_id: int):
     next_cooldown = 1 if profile.resend_count <= 3 else 5 * (2 ** (profile.resend_count - 4))
     profile.cooldown_until = timezone.now() + timedelta(minutes=min(next_cooldown, 1440))
 
-    raw_code = get_random_string(6, allowed_chars='0123456789')
-    profile.email_verification_code = make_password(raw_code)
+    raw_code = otp.issue_code(profile, otp.PURPOSE_EMAIL_CHANGE)
     profile.save()
 
     return True, (raw_code, profile.pending_email)
 
 
+# ── Per-user data version ──────────────────────────────────────
+# Every write to a user's transactions or goals goes through this module and
+# bumps the user's data version. Read models (dashboard, charts) are cached
+# under the current version, so a write makes the old entries unreachable on
+# every worker at once instead of waiting for a TTL.
+
+def _data_namespace(user_id: int) -> str:
+    return f"data:{user_id}"
+
+
+def get_data_version(user_id: int):
+    return cache.get_stamp(_data_namespace(user_id))
+
+
+def bump_data_version(user_id: int):
+    # After commit, or a concurrent reader could cache pre-write rows under
+    # the new version
+    transaction.on_commit(lambda: cache.bump_stamp(_data_namespace(user_id)))
+
+
+def _record_deletes(user_id: int, kind: str, ids):
+    """Leaves a tombstone per deleted row for delta sync, see get_changes()."""
+    Tombstone.objects.bulk_create([Tombstone(user_id=user_id, kind=kind, object_id=pk) for pk in ids])
+    # Clients that haven't synced within the retention window resync fully,
+    # so older tombstones are dead weight. A small fraction of writes sweep.
+    if random.random() < 0.01:
+        cutoff = timezone.now() - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 90))
+        Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+
+
 def create_transaction(dto: TransactionDTO):
-    return Transaction.objects.create(
+    txn = Transaction.objects.create(
         user_id=dto.user_id,
         amount=dto.amount,
         type=dto.transaction_type,
@@ -257,6 +325,8 @@ def create_transaction(dto: TransactionDTO):
         date=dto.date,
         description=dto.description
     )
+    bump_data_version(dto.user_id)
+    return txn
 
 
 def update_transaction(transaction_id: int, dto: TransactionDTO):
@@ -267,21 +337,204 @@ def update_transaction(transaction_id: int, dto: TransactionDTO):
     txn.date = dto.date
     txn.description = dto.description
     txn.save()
+    bump_data_version(dto.user_id)
     return txn
 
 
 def delete_transaction(transaction_id: int, user_id: int):
     txn = get_object_or_404(Transaction, id=transaction_id, user_id=user_id)
-    txn.delete()
+    with transaction.atomic():
+        txn.delete()
+        _record_deletes(user_id, 'transaction', [transaction_id])
+    bump_data_version(user_id)
     return True
 
 
+_BULK_FIELDS = ('amount', 'type', 'category', 'date', 'description')
+
+
+def transaction_dto_from_payload(user_id: int, payload: dict) -> TransactionDTO:
+    """
+    TransactionDTO from a JSON transaction ({amount, type, category, date,
+    description}), as sent to the API and in bulk operations. Any malformed
+    field raises ValueError with a message fit for the client.
+    """
+    return TransactionDTO(
+        user_id=user_id,
+        amount=payload.get('amount'),
+        transaction_type=payload.get('type'),
+        category=payload.get('category'),
+        date=payload.get('date'),
+        description=payload.get('description') or '',
+    )
+
+
+def bulk_transactions(user_id: int, operations: list) -> list:
+    """
+    Applies a batch of {"op": "create"|"update"|"delete", ...} operations.
+    create/update carry amount, type, category, date and description (update
+    and delete also an "id") and are validated through
+    transaction_dto_from_payload().
+
+    Invalid items are reported and skipped; everything valid is written in a
+    single DB transaction with one bulk_create, one bulk_update and one
+    DELETE ... WHERE id IN. Returns one result dict per operation, in order.
+    """
+    max_ops = getattr(settings, 'BULK_MAX_OPERATIONS', 500)
+    if not isinstance(operations, list) or not operations:
+        raise ServiceError("operations must be a non-empty list.")
+    if len(operations) > max_ops:
+        raise ServiceError(f"At most {max_ops} operations per request.")
+
+    results = [None] * len(operations)
+    to_create, to_update, to_delete = [], {}, {}
+
+    def fail(i, op, message):
+        results[i] = {'index': i, 'op': op, 'status': 'error', 'message': message}
+
+    for i, item in enumerate(operations):
+        op = item.get('op') if isinstance(item, dict) else None
+        if op not in ('create', 'update', 'delete'):
+            fail(i, op, "op must be create, update or delete.")
+            continue
+
+        if op != 'create':
+            try:
+                pk = int(item.get('id'))
+            except (TypeError, ValueError):
+                fail(i, op, "A valid id is required.")
+                continue
+            if pk in to_update or pk in to_delete:
+                fail(i, op, "This id appears more than once in the batch.")
+                continue
+            if op == 'delete':
+                to_delete[pk] = i
+                continue
+
+        try:
+            dto = transaction_dto_from_payload(user_id, item)
+        except ValueError as e:
+            fail(i, op, str(e))
+            continue
+
+        if op == 'create':
+            to_create.append((i, dto))
+        else:
+            to_update[pk] = (i, dto)
+
+    with transaction.atomic():
+        owned = set(Transaction.objects.filter(
+            user_id=user_id, id__in=[*to_update, *to_delete]
+        ).values_list('id', flat=True)) if (to_update or to_delete) else set()
+
+        # Create
+        new = [
+            Transaction(user_id=user_id, amount=dto.amount, type=dto.transaction_type,
+                        category=dto.category, date=dto.date, description=dto.description)
+            for _, dto in to_create
+        ]
+        for txn in new:
+            txn.normalize()  # what save() does for create_transaction()
+        created = Transaction.objects.bulk_create(new)
+        for (i, _), txn in zip(to_create, created):
+            results[i] = {'index': i, 'op': 'create', 'status': 'ok', 'id': txn.pk}
+
+        # Update. bulk_update skips auto_now, so stamp updated_at ourselves
+        now, changed = timezone.now(), []
+        for pk, (i, dto) in to_update.items():
+            if pk not in owned:
+                fail(i, 'update', "Transaction not found.")
+                continue
+            txn = Transaction(pk=pk, user_id=user_id, amount=dto.amount, type=dto.transaction_type,
+                              category=dto.category, date=dto.date, description=dto.description,
+                              updated_at=now)
+            txn.normalize()
+            changed.append(txn)
+            results[i] = {'index': i, 'op': 'update', 'status': 'ok', 'id': pk}
+        if changed:
+            Transaction.objects.bulk_update(changed, (*_BULK_FIELDS, 'updated_at'))
+
+        # Delete
+        doomed = []
+        for pk, i in to_delete.items():
+            if pk not in owned:
+                fail(i, 'delete', "Transaction not found.")
+                continue
+            doomed.append(pk)
+            results[i] = {'index': i, 'op': 'delete', 'status': 'ok', 'id': pk}
+        if doomed:
+            Transaction.objects.filter(user_id=user_id, id__in=doomed).delete()
+            _record_deletes(user_id, 'transaction', doomed)
+
+        if created or changed or doomed:
+            bump_data_version(user_id)
+
+    return results
+
+
+
+def _get_prompt_cache(client, types):
+    """
+    Returns the name of the provider-side cache holding the static prompt,
+    creating it if needed. Returns None when caching is unavailable (e.g. the
+    prompt is below the provider's minimum cacheable size) so callers fall
+    back to sending the prompt inline.
+    """
+    ttl = int(getattr(settings, 'GEMINI_PROMPT_CACHE_TTL', 3600))
+    min_tokens = int(getattr(settings, 'GEMINI_PROMPT_CACHE_MIN_TOKENS', 4096))
+    now = time.monotonic()
+
+    with _prompt_cache_lock:
+        if _prompt_cache['name'] and now < _prompt_cache['expires_at']:
+            return _prompt_cache['name']
+        if now < _prompt_cache['retry_at'] or _prompt_cache['creating']:
+            return None
+        _prompt_cache['creating'] = True
+
+    name, expires_at, retry_at = None, 0.0, 0.0
+    try:
+        tokens = client.models.count_tokens(
+            model=_CATEGORIZE_MODEL, contents=[_PROMPT_PREFIX, _PROMPT_SUFFIX]
+        ).total_tokens
+        if tokens < min_tokens:
+            # The prompt file doesn't change while we run, so neither will this
+            logger.info("Categorization prompt is %s tokens, below the %s-token cache minimum; "
+                        "sending it inline", tokens, min_tokens)
+            retry_at = float('inf')
+        else:
+            cached = client.caches.create(
+                model=_CATEGORIZE_MODEL,
+                config=types.CreateCachedContentConfig(
+                    display_name='categorize-prompt',
+                    system_instruction=_PROMPT_SUFFIX,
+                    contents=[_PROMPT_PREFIX],
+                    ttl=f'{ttl}s',
+                )
+            )
+            name, expires_at = cached.name, now + max(ttl - 60, 0)
+            logger.info("Registered categorization prompt cache %s (ttl=%ss)", name, ttl)
+    except Exception as e:
+        logger.warning("Prompt cache unavailable, sending prompt inline: %s", e)
+        retry_at = now + ttl
+    finally:
+        with _prompt_cache_lock:
+            _prompt_cache.update(name=name, expires_at=expires_at, retry_at=retry_at, creating=False)
+    return name
+
+
+def _invalidate_prompt_cache(name):
+    with _prompt_cache_lock:
+        if _prompt_cache['name'] == name:
+            _prompt_cache.update(name=None, expires_at=0.0)
+
 
 def get_categories_from_ai(descriptions: list) -> dict:
     """
     Sends a batch of transaction descriptions to Gemini for categorization.
     The prompt is loaded from tracker/prompts/categorize_prompt.txt so the
     Nigerian context knowledge lives in a text file, not in Python code.
+    The static part of the prompt is served from Gemini's context cache when
+    available; otherwise the full prompt is sent inline.
     """
     from google import genai
     from google.genai import types
@@ -305,16 +558,34 @@ def get_categories_from_ai(descriptions: list) -> dict:
         logger.error("Gemini client init failed: %s", e)
         return {}
 
-    prompt = _PROMPT_TEMPLATE.format(descriptions=json.dumps(unique))
-
     try:
-        response = client.models.generate_content(
-            model='gemini-2.0-flash',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                response_mime_type='application/json'
+        response = None
+        cache_name = _get_prompt_cache(client, types)
+        if cache_name:
+            try:
+                response = client.models.generate_content(
+                    model=_CATEGORIZE_MODEL,
+                    contents=json.dumps(unique),
+                    config=types.GenerateContentConfig(
+                        cached_content=cache_name,
+                        response_mime_type='application/json'
+                    )
+                )
+            except Exception as e:
+                # The provider can evict a cache before its TTL — drop our
+                # handle and retry once with the inline prompt.
+                logger.warning("Cached prompt %s rejected, retrying inline: %s", cache_name, e)
+                _invalidate_prompt_cache(cache_name)
+
+        if response is None:
+            response = client.models.generate_content(
+                model=_CATEGORIZE_MODEL,
+                contents=_PROMPT_TEMPLATE.format(descriptions=json.dumps(unique)),
+                config=types.GenerateContentConfig(
+                    response_mime_type='application/json'
+                )
             )
-        )
+
         result = json.loads(response.text)
         valid = {'food', 'transport', 'bills', 'housing', 'entertainment',
                  'shopping', 'health', 'education', 'income', 'other'}
@@ -328,8 +599,6 @@ def get_categories_from_ai(descriptions: list) -> dict:
         return {}
 
 
-
-
 def import_transactions_service(dto):
     """
     Imports transactions from a CSV or XLSX bank statement.
@@ -495,6 +764,7 @@ def import_transactions_service(dto):
         ))
 
     Transaction.objects.bulk_create(to_create, ignore_conflicts=True)
+    bump_data_version(dto.user_id)
     logger.info("Imported %d transactions for user_id=%s", len(to_create), dto.user_id)
     return len(to_create)
 
@@ -507,6 +777,7 @@ def set_budget_goal(dto: SetGoalDTO):
         year=dto.year,
         defaults={'target_amount': dto.target_amount}
     )
+    bump_data_version(dto.user_id)
     return obj
 
 
@@ -515,9 +786,31 @@ def update_goal(dto: UpdateGoalDTO):
     goal.category = dto.category
     goal.target_amount = dto.target_amount
     goal.save()
+    bump_data_version(dto.user_id)
     return goal
 
 
+def delete_goal(goal_id: int, user_id: int):
+    goal = get_object_or_404(BudgetGoal, pk=goal_id, user_id=user_id)
+    with transaction.atomic():
+        goal.delete()
+        _record_deletes(user_id, 'goal', [goal_id])
+    bump_data_version(user_id)
+    return True
+
+
+def clear_monthly_goals(user_id: int, year: int, month: int):
+    """Deletes the month's goals and locks it against auto-import. Returns the count."""
+    with transaction.atomic():
+        goals = BudgetGoal.objects.filter(user_id=user_id, year=year, month=month)
+        ids = list(goals.values_list('id', flat=True))
+        count, _ = goals.delete()
+        _record_deletes(user_id, 'goal', ids)
+        BudgetLock.objects.get_or_create(user_id=user_id, year=year, month=month)
+        bump_data_version(user_id)
+    return count
+
+
 def import_previous_goals(dto: ImportGoalsDTO):
     with transaction.atomic():
         latest = BudgetGoal.objects.filter(user_id=dto.user_id)\
@@ -527,9 +820,11 @@ def import_previous_goals(dto: ImportGoalsDTO):
         if not latest:
             raise ServiceError("No previous goals found to import.")
 
-        BudgetGoal.objects.filter(
+        replaced = BudgetGoal.objects.filter(
             user_id=dto.user_id, month=dto.target_month, year=dto.target_year
-        ).delete()
+        )
+        _record_deletes(dto.user_id, 'goal', list(replaced.values_list('id', flat=True)))
+        replaced.delete()
 
         templates = BudgetGoal.objects.filter(
             user_id=dto.user_id, month=latest.month, year=latest.year
@@ -544,6 +839,7 @@ def import_previous_goals(dto: ImportGoalsDTO):
             ) for g in templates
         ]
         BudgetGoal.objects.bulk_create(new_goals)
+        bump_data_version(dto.user_id)
         return len(new_goals)
 
 
@@ -551,4 +847,282 @@ def update_currency(dto: UpdateCurrencyDTO):
     UserProfile.objects.update_or_create(
         user_id=dto.user_id,
         defaults={'currency_code': dto.currency_code}
-    )
\ No newline at end of file
+    )
+
+
+# ── Read models ────────────────────────────────────────────────
+# Plain dicts of Decimals/dates so they pickle small and can't lazily run
+# queries from a template.
+
+def get_dashboard_data(user_id: int, year: int, month: int, stamp=None) -> dict:
+    """
+    Dashboard payload for one month, cached per data version. Callers reading
+    several read models at once can pass the get_data_version() they hold.
+    """
+    namespace = _data_namespace(user_id)
+    if stamp is None:
+        stamp = cache.get_stamp(namespace)
+    key = f"dashboard:{year}-{month}"
+    data = cache.get_versioned(namespace, key, stamp=stamp)
+    if data is None:
+        data = _build_dashboard_data(user_id, year, month)
+        cache.set_versioned(namespace, key, data, getattr(settings, 'DATA_CACHE_TIMEOUT', 86400), stamp=stamp)
+    return data
+
+
+def _build_dashboard_data(user_id: int, year: int, month: int) -> dict:
+    """
+    Three queries: one conditional aggregate for the monthly and all-time
+    totals plus the month's expense per category, the goals (their spend is
+    that per-category total), and the five most recent transactions.
+    """
+    category_labels = dict(Transaction.CATEGORY_CHOICES)
+    in_month = Period.month(year, month).q()
+    month_expense = in_month & Q(type='Expense')
+
+    totals = Transaction.objects.filter(user_id=user_id).aggregate(
+        income=Sum('amount', filter=Q(type='Income')),
+        expense=Sum('amount', filter=Q(type='Expense')),
+        monthly_income=Sum('amount', filter=in_month & Q(type='Income')),
+        monthly_expense=Sum('amount', filter=month_expense),
+        **{
+            f'cat_{code}': Sum('amount', filter=month_expense & Q(category=code))
+            for code in category_labels
+        },
+    )
+    expense_by_category = {
+        code: totals[f'cat_{code}'] for code in category_labels if totals[f'cat_{code}']
+    }
+
+    goals = []
+    for goal in (BudgetGoal.objects
+                 .filter(user_id=user_id, month=month, year=year)
+                 .order_by('category')
+                 .values('id', 'category', 'target_amount')):
+        # The goal's month is the month aggregated above
+        goal['spent'] = totals.get(f"cat_{goal['category']}") or Decimal('0.00')
+        spent = goal['spent']
+        target = goal['target_amount']
+        real_percent = (spent / target) * 100 if target > 0 else 0
+
+        if real_percent > 100:
+            status = 'exceeded'
+        elif real_percent >= 80:
+            status = 'warning'
+        else:
+            status = 'good'
+
+        goals.append({
+            'id': goal['id'],
+            'category': goal['category'],
+            'category_display': category_labels.get(goal['category'], goal['category']),
+            'target_amount': target,
+            'actual_spent': spent,
+            'progress_percent': real_percent,
+            'remaining': target - spent,
+            'percent': min(int(real_percent), 100),
+            'status': status,
+        })
+
+    recent = [
+        dict(t, category_display=category_labels.get(t['category'], t['category']))
+        for t in Transaction.objects.filter(user_id=user_id).order_by('-date', '-id')
+        .values('id', 'amount', 'type', 'category', 'date', 'description')[:5]
+    ]
+
+    monthly_income = totals['monthly_income'] or Decimal('0.00')
+    monthly_expense = totals['monthly_expense'] or Decimal('0.00')
+    total_income = totals['income'] or Decimal('0.00')
+    total_expense = totals['expense'] or Decimal('0.00')
+
+    return {
+        'goals': goals,
+        'recent_transactions': recent,
+        'expense_by_category': expense_by_category,
+        'monthly_income': monthly_income,
+        'monthly_expense': monthly_expense,
+        'monthly_balance': monthly_income - monthly_expense,
+        'total_income': total_income,
+        'total_expense': total_expense,
+        'balance': total_income - total_expense,
+    }
+
+
+def get_chart_data(user_id: int, start: dt.date = None, end: dt.date = None,
+                   granularity: str = 'month', stamp=None) -> dict:
+    """
+    Totals, expense-by-category and an income/expense time series for the
+    charts page, from start to end inclusive (either may be open). Cached per
+    data version, like get_dashboard_data().
+    """
+    if granularity not in TRUNC:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    namespace = _data_namespace(user_id)
+    if stamp is None:
+        stamp = cache.get_stamp(namespace)
+    key = f"charts:{start}:{end}:{granularity}"
+    data = cache.get_versioned(namespace, key, stamp=stamp)
+    if data is None:
+        data = _build_chart_data(user_id, start, end, granularity)
+        cache.set_versioned(namespace, key, data, getattr(settings, 'DATA_CACHE_TIMEOUT', 86400), stamp=stamp)
+    return data
+
+
+def _build_chart_data(user_id: int, start, end, granularity: str) -> dict:
+    qs = Transaction.objects.filter(user_id=user_id)
+    if start and end:
+        qs = qs.filter(Period.custom(start, end).q())
+    elif start:
+        qs = qs.filter(date__gte=start)
+    elif end:
+        qs = qs.filter(date__lte=end)
+
+    # One grouped query gives the series; the totals are its sums, so the
+    # user's history is no longer scanned once per figure
+    rows = (qs.annotate(bucket=TRUNC[granularity]('date'))
+            .values('bucket')
+            .annotate(income=Sum('amount', filter=Q(type='Income')),
+                      expense=Sum('amount', filter=Q(type='Expense')))
+            .order_by('bucket'))
+    by_bucket = {r['bucket']: (float(r['income'] or 0), float(r['expense'] or 0)) for r in rows}
+
+    cat_qs = (qs.filter(type='Expense')
+              .values('category')
+              .annotate(total=Sum('amount'))
+              .order_by('-total'))
+
+    labels, income, expense = [], [], []
+    if by_bucket:
+        # Zero-filled so quiet days show as zero, not as a straight line.
+        # Clamped to the user's data (and today) so an extreme range can't
+        # make us fill centuries of empty buckets.
+        first = max(start, min(by_bucket)) if start else min(by_bucket)
+        last = max(by_bucket)
+        if end:
+            last = max(last, min(end, timezone.localdate()))
+        for bucket in bucket_starts(first, last, granularity):
+            inc, exp = by_bucket.get(bucket, (0.0, 0.0))
+            labels.append(bucket.isoformat())
+            income.append(inc)
+            expense.append(exp)
+
+    total_income = sum(income)
+    total_expense = sum(expense)
+
+    # Keep the payload bounded however long the range: LTTB picks the points
+    # that preserve each line's shape, and the union keeps a shared x axis
+    max_points = getattr(settings, 'CHART_MAX_POINTS', 180)
+    downsampled = len(labels) > max_points
+    if downsampled:
+        keep = sorted(set(_lttb_indices(income, max_points // 2)) | set(_lttb_indices(expense, max_points // 2)))
+        labels = [labels[i] for i in keep]
+        income = [income[i] for i in keep]
+        expense = [expense[i] for i in keep]
+
+    category_label_map = dict(Transaction.CATEGORY_CHOICES)
+    return {
+        "total_income": total_income,
+        "total_expense": total_expense,
+        "balance": total_income - total_expense,
+        "category_labels": [category_label_map.get(r['category'], r['category']) for r in cat_qs],
+        "category_values": [float(r['total']) for r in cat_qs],
+        "series": {
+            "granularity": granularity,
+            "labels": labels,
+            "income": income,
+            "expense": expense,
+            "downsampled": downsampled,
+        },
+    }
+
+
+def _lttb_indices(values: list, threshold: int) -> list:
+    """
+    Largest-Triangle-Three-Buckets: indices of `threshold` points of an
+    evenly spaced series that best keep its visual shape. Always keeps the
+    first and last point.
+    """
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+
+    picked = [0]
+    bucket_size = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+
+        # Average of the next bucket is the third triangle corner
+        next_start, next_end = end, min(int((i + 2) * bucket_size) + 1, n)
+        if next_start >= next_end:
+            next_start, next_end = n - 1, n
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((a - avg_x) * (values[j] - values[a]) - (a - j) * (avg_y - values[a]))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+
+    picked.append(n - 1)
+    return picked
+
+
+# ── Delta sync ─────────────────────────────────────────────────
+# Tokens are opaque to clients: microseconds since the epoch of the moment a
+# sync read started, minus SYNC_TOKEN_OVERLAP. A row saved inside a longer
+# transaction can commit after our read with an updated_at just before it;
+# the overlap picks it up next time at the cost of a few repeated upserts,
+# which clients apply idempotently by id.
+
+_TXN_SYNC_FIELDS = ('id', 'amount', 'type', 'category', 'date', 'description', 'updated_at')
+_GOAL_SYNC_FIELDS = ('id', 'category', 'target_amount', 'month', 'year', 'updated_at')
+
+
+def _encode_sync_token(moment: dt.datetime) -> str:
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def _decode_sync_token(token: str) -> dt.datetime:
+    try:
+        micros = int(token)
+        return dt.datetime.fromtimestamp(micros / 1_000_000, tz=dt.timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        raise ServiceError("Invalid sync token.")
+
+
+def get_changes(user_id: int, token: str = None) -> dict:
+    """
+    Transactions and goals created or updated since token, plus the ids of
+    those deleted since, and the token to pass next time.
+
+    With no token, or one older than the tombstone retention, returns
+    full=True and every row with no deletions: the client replaces its copy.
+    """
+    started = timezone.now()
+    since = _decode_sync_token(token) if token else None
+    full = since is None or since < started - timedelta(days=getattr(settings, 'SYNC_TOMBSTONE_DAYS', 90))
+
+    transactions = Transaction.objects.filter(user_id=user_id)
+    goals = BudgetGoal.objects.filter(user_id=user_id)
+    deleted = {'transactions': [], 'goals': []}
+    if not full:
+        transactions = transactions.filter(updated_at__gte=since)
+        goals = goals.filter(updated_at__gte=since)
+        for kind, object_id in Tombstone.objects.filter(
+            user_id=user_id, deleted_at__gte=since
+        ).values_list('kind', 'object_id'):
+            deleted['transactions' if kind == 'transaction' else 'goals'].append(object_id)
+
+    overlap = timedelta(seconds=getattr(settings, 'SYNC_TOKEN_OVERLAP', 5))
+    return {
+        'token': _encode_sync_token(started - overlap),
+        'full': full,
+        'transactions': list(transactions.order_by('updated_at', 'id').values(*_TXN_SYNC_FIELDS)),
+        'goals': list(goals.order_by('updated_at', 'id').values(*_GOAL_SYNC_FIELDS)),
+        'deleted': deleted,
+    }
@@ -1,3 +1,880 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.db import DatabaseError, connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import backends, jobs, middleware, otp, outbox, ratelimit, services
+from .cache import TwoTierCache
+from .handlers import ApiHandler
+from .models import AIJob, AIUsage, BudgetGoal, CacheStamp, OutboundEmail, Transaction
+from .periods import Period
+from .schemas import ImportGoalsDTO, TransactionDTO
+from .tokens import issue_token
+from .ratelimit import RateLimitError, check_ratelimit
+
+
+class StubGemini:
+    """Records what get_categories_from_ai sends; stands in for genai.Client."""
+
+    REPLY = {'SHOPRITE': 'food', 'CHICKEN REPUBLIC': 'food', 'UBER': 'transport'}
+
+    def __init__(self, prompt_tokens=5000):
+        self.prompt_tokens = prompt_tokens
+        self.created = []
+        self.calls = []
+        self.models = SimpleNamespace(count_tokens=self.count_tokens, generate_content=self.generate_content)
+        self.caches = SimpleNamespace(create=self.create)
+
+    def count_tokens(self, model, contents):
+        return SimpleNamespace(total_tokens=self.prompt_tokens)
+
+    def create(self, model, config):
+        self.created.append(config)
+        return SimpleNamespace(name=f'cachedContents/{len(self.created)}')
+
+    def generate_content(self, model, contents, config):
+        self.calls.append((contents, config.cached_content))
+        return SimpleNamespace(text=json.dumps(self.REPLY))
+
+
+@override_settings(GEMINI_API_KEY='test-key', GEMINI_PROMPT_CACHE_TTL=3600, GEMINI_PROMPT_CACHE_MIN_TOKENS=4096)
+class PromptCacheTests(SimpleTestCase):
+    def setUp(self):
+        services._prompt_cache.update(name=None, expires_at=0.0, retry_at=0.0, creating=False)
+        self.addCleanup(services._prompt_cache.update, name=None, expires_at=0.0, retry_at=0.0, creating=False)
+
+    def categorize(self, stub, descriptions):
+        with mock.patch('google.genai.Client', return_value=stub):
+            return services.get_categories_from_ai(descriptions)
+
+    def test_prefix_is_cached_once_and_reused(self):
+        stub = StubGemini()
+        self.categorize(stub, ['SHOPRITE'])
+        self.categorize(stub, ['CHICKEN REPUBLIC'])
+
+        self.assertEqual(len(stub.created), 1)
+        self.assertEqual([c for _, c in stub.calls], ['cachedContents/1', 'cachedContents/1'])
+        # Only the description list goes over the wire once the prefix is cached
+        self.assertEqual(stub.calls[1][0], json.dumps(['CHICKEN REPUBLIC']))
+
+    def test_small_prompt_is_sent_inline_without_retrying(self):
+        stub = StubGemini(prompt_tokens=500)
+        with mock.patch.object(stub.models, 'count_tokens', wraps=stub.count_tokens) as count:
+            self.categorize(stub, ['SHOPRITE'])
+            self.categorize(stub, ['UBER'])
+
+        self.assertEqual(count.call_count, 1)
+        self.assertEqual(stub.created, [])
+        self.assertEqual([c for _, c in stub.calls], [None, None])
+        self.assertIn('UBER', stub.calls[1][0])
+        self.assertGreater(len(stub.calls[1][0]), len(json.dumps(['UBER'])))
+
+    def test_rejected_cache_falls_back_inline(self):
+        stub = StubGemini()
+        self.categorize(stub, ['SHOPRITE'])
+        generate = stub.models.generate_content
+
+        def reject_cached(model, contents, config):
+            if config.cached_content:
+                raise RuntimeError('cache not found')
+            return generate(model, contents, config)
+
+        stub.models.generate_content = reject_cached
+        self.assertEqual(self.categorize(stub, ['UBER'])['UBER'], 'transport')
+        self.assertIsNone(stub.calls[-1][1])
+        self.assertIsNone(services._prompt_cache['name'])
+
+
+@override_settings(AI_MAX_PENDING_PER_USER=1, AI_DAILY_CALL_QUOTA=5)
+class SubmitJobTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        self.slots = threading.BoundedSemaphore(1)
+        self.executor = mock.Mock()
+        for name, value in (('_process_slots', self.slots), ('_executor', self.executor)):
+            patcher = mock.patch.object(jobs, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def calls_used(self):
+        return AIUsage.objects.get(user=self.user, day=timezone.localdate()).calls
+
+    def test_second_pending_job_is_refused(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.submit_job(self.user.pk, 'audit', dict)
+        with self.assertRaises(jobs.AIQuotaError):
+            jobs.submit_job(self.user.pk, 'audit', dict)
+        self.assertEqual(AIJob.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.calls_used(), 1)
+
+    def test_failed_insert_refunds_the_call(self):
+        with mock.patch.object(AIJob.objects, 'create', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                jobs.submit_job(self.user.pk, 'audit', dict)
+        self.assertEqual(AIUsage.objects.filter(user=self.user, calls__gt=0).count(), 0)
+
+    def test_rolled_back_submit_keeps_the_process_slot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    jobs.submit_job(self.user.pk, 'audit', dict)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertTrue(self.slots.acquire(blocking=False))
+        self.executor.submit.assert_not_called()
+
+    def test_full_process_fails_the_job_and_refunds(self):
+        self.slots.acquire()
+        with self.captureOnCommitCallbacks(execute=True):
+            job = jobs.submit_job(self.user.pk, 'audit', dict)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(self.calls_used(), 0)
+        self.executor.submit.assert_not_called()
+
+
+@skipUnless(connection.vendor == 'postgresql', "needs row locks; SQLite ignores select_for_update()")
+@override_settings(AI_MAX_PENDING_PER_USER=1, AI_DAILY_CALL_QUOTA=50)
+class ConcurrentSubmitJobTests(TransactionTestCase):
+    def test_concurrent_submits_admit_one(self):
+        user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        barrier = threading.Barrier(8)
+        outcomes = []
+
+        def submit():
+            try:
+                barrier.wait()
+                jobs.submit_job(user.pk, 'audit', dict)
+                outcomes.append('queued')
+            except jobs.AIQuotaError:
+                outcomes.append('refused')
+            finally:
+                connection.close()
+
+        with mock.patch.object(jobs, '_executor'), \
+                mock.patch.object(jobs, '_process_slots', threading.BoundedSemaphore(8)):
+            threads = [threading.Thread(target=submit) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+        self.assertEqual(outcomes.count('queued'), 1)
+        self.assertEqual(AIJob.objects.filter(user=user).count(), 1)
+        self.assertEqual(AIUsage.objects.get(user=user).calls, 1)
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    'ratelimit': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit-tests'},
+}, RATELIMIT_CACHE_ALIAS='ratelimit')
+@override_settings(EMAIL_OUTBOX_NUDGE=False, EMAIL_OUTBOX_MAX_ATTEMPTS=1)
+class OutboxTests(TestCase):
+    def enqueue(self):
+        return outbox.enqueue_email('ada@example.com', 'Your code', '<p>Code: 123456</p>')
+
+    def drain(self, error=None):
+        with mock.patch.object(outbox, 'deliver_email', side_effect=error) as deliver:
+            outbox.drain_outbox()
+        return deliver
+
+    def test_body_is_cleared_once_sent(self):
+        msg = self.enqueue()
+        self.drain().assert_called_once_with('ada@example.com', 'Your code', '<p>Code: 123456</p>')
+        msg.refresh_from_db()
+        self.assertEqual((msg.status, msg.html_content), ('sent', ''))
+
+    def test_body_is_cleared_once_dead_lettered(self):
+        msg = self.enqueue()
+        self.drain(error=OSError('smtp down'))
+        msg.refresh_from_db()
+        self.assertEqual((msg.status, msg.html_content), ('dead', ''))
+
+    def test_purge_removes_old_sent_and_dead_rows(self):
+        old = timezone.now() - timedelta(days=8)
+        sent, dead, fresh, pending = (self.enqueue() for _ in range(4))
+        OutboundEmail.objects.filter(pk=sent.pk).update(status='sent', sent_at=old)
+        OutboundEmail.objects.filter(pk=dead.pk).update(status='dead', created_at=old)
+        OutboundEmail.objects.filter(pk=fresh.pk).update(status='dead')
+        OutboundEmail.objects.filter(pk=pending.pk).update(created_at=old)
+        self.assertEqual(outbox.purge_finished(), 2)
+        self.assertQuerySetEqual(OutboundEmail.objects.order_by('pk'), [fresh, pending])
+
+    def test_admin_does_not_show_the_body(self):
+        msg = self.enqueue()
+        self.client.force_login(User.objects.create_superuser('root', 'root@example.com', 'pw'))
+        for url in (reverse('admin:tracker_outboundemail_changelist'),
+                    reverse('admin:tracker_outboundemail_change', args=[msg.pk])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotContains(response, '123456')
+
+
+class RateLimitConcurrencyTests(TransactionTestCase):
+    THREADS, LIMIT = 8, 10
+
+    def hammer(self, backend):
+        """THREADS threads x LIMIT attempts at once; returns how many got through."""
+        barrier = threading.Barrier(self.THREADS)
+        admitted = []
+
+        def attempt():
+            barrier.wait()
+            try:
+                for _ in range(self.LIMIT):
+                    try:
+                        check_ratelimit('hammer', limit=self.LIMIT, period=60)
+                        admitted.append(1)
+                    except RateLimitError:
+                        pass
+            finally:
+                connection.close()
+
+        # Pin the clock mid-window so the run can't straddle a window boundary
+        with override_settings(RATELIMIT_BACKEND=backend), \
+                mock.patch.object(ratelimit, 'time', SimpleNamespace(time=lambda: 1_800_000_030.0)), \
+                mock.patch.object(ratelimit.logger, 'error') as backend_error:
+            threads = [threading.Thread(target=attempt) for _ in range(self.THREADS)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        # A backend error fails open, which would hide a broken counter
+        backend_error.assert_not_called()
+        return len(admitted)
+
+    def test_database_backend_admits_exactly_limit(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("shared-cache in-memory SQLite raises 'table is locked' instead of waiting")
+        self.assertEqual(self.hammer('tracker.ratelimit.DatabaseBackend'), self.LIMIT)
+
+    def test_cache_backend_admits_exactly_limit(self):
+        # The database cache's incr() is a read-then-write, so it can't back
+        # CacheBackend; LocMemCache stands in for Redis here
+        locmem = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'ratelimit-tests'}
+        with override_settings(CACHES={**settings.CACHES, 'ratelimit-tests': locmem},
+                               RATELIMIT_CACHE_ALIAS='ratelimit-tests'):
+            ratelimit._get_backend.cache_clear()
+            self.addCleanup(ratelimit._get_backend.cache_clear)
+            self.assertEqual(self.hammer('tracker.ratelimit.CacheBackend'), self.LIMIT)
+
+    def test_previous_window_counts_toward_the_limit(self):
+        backend = 'tracker.ratelimit.CacheBackend'
+        with override_settings(RATELIMIT_BACKEND=backend), \
+                mock.patch.object(ratelimit, 'time', SimpleNamespace(time=lambda: 1_800_000_050.0)):
+            for _ in range(self.LIMIT):
+                check_ratelimit('slide', limit=self.LIMIT, period=60)
+        # 15s into the next window three quarters of the previous one still
+        # overlap: 7.5 + 1 and 7.5 + 2 pass, the third hit tips it over
+        with override_settings(RATELIMIT_BACKEND=backend), \
+                mock.patch.object(ratelimit, 'time', SimpleNamespace(time=lambda: 1_800_000_075.0)):
+            admitted = 0
+            for _ in range(self.LIMIT):
+                try:
+                    check_ratelimit('slide', limit=self.LIMIT, period=60)
+                    admitted += 1
+                except RateLimitError:
+                    pass
+        self.assertEqual(admitted, 2)
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    'stamp-tests': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stamp-tests',
+        'KEY_PREFIX': 'shared',
+    },
+})
+class TwoTierCacheTests(TransactionTestCase):
+    def make_cache(self, stamps='database'):
+        return TwoTierCache('', {'KEY_PREFIX': 'local', 'OPTIONS': {'L2': 'stamp-tests', 'STAMPS': stamps}})
+
+    def test_l2_gets_raw_keys(self):
+        cache = self.make_cache()
+        cache.set('greeting', 'hello')
+        self.assertEqual(caches['stamp-tests'].get('greeting'), 'hello')
+        caches['stamp-tests'].set('greeting', 'changed')
+        cache._l1.clear()
+        self.assertEqual(cache.get('greeting'), 'changed')
+
+    def test_bump_invalidates_versioned_values_on_every_worker(self):
+        worker_a, worker_b = self.make_cache(), self.make_cache()
+        worker_a.set_versioned('data:1', 'dashboard', 'old')
+        self.assertEqual(worker_b.get_versioned('data:1', 'dashboard'), 'old')
+
+        worker_a.bump_stamp('data:1')
+        self.assertIsNone(worker_a.get_versioned('data:1', 'dashboard'))
+        self.assertIsNone(worker_b.get_versioned('data:1', 'dashboard'))
+
+    def test_bump_before_first_read_still_moves_the_stamp(self):
+        cache = self.make_cache()
+        bumped = cache.bump_stamp('data:2')
+        self.assertEqual(cache.get_stamp('data:2'), bumped)
+        self.assertEqual(cache.bump_stamp('data:2'), bumped + 1)
+
+    def test_concurrent_bumps_never_share_a_stamp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("shared-cache in-memory SQLite raises 'table is locked' instead of waiting")
+        cache = self.make_cache()
+        start = cache.get_stamp('data:3')
+        barrier = threading.Barrier(8)
+        stamps = []
+
+        def bump():
+            barrier.wait()
+            try:
+                for _ in range(5):
+                    stamps.append(cache.bump_stamp('data:3'))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=bump) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(sorted(stamps), list(range(start + 1, start + 41)))
+        self.assertEqual(CacheStamp.objects.get(namespace='data:3').value, start + 40)
+
+
+class CheckCodeTests(TestCase):
+    def setUp(self):
+        self.profile = User.objects.create_user('ada', 'ada@example.com', 'pw').userprofile
+
+    def test_fresh_code_passes_once(self):
+        code = otp.issue_code(self.profile, otp.PURPOSE_VERIFY)
+        self.profile.save()
+        self.assertEqual(otp.check_code(self.profile, otp.PURPOSE_VERIFY, code), (True, None))
+        ok, _ = otp.check_code(self.profile, otp.PURPOSE_EMAIL_CHANGE, code)
+        self.assertFalse(ok)
+
+    def test_legacy_code_expires_from_generation_time(self):
+        self.profile.email_verification_code = make_password('123456')
+        self.profile.code_expires_at = None
+        self.profile.code_generated_at = timezone.now() - timedelta(hours=1)
+        self.profile.save()
+        self.assertEqual(
+            otp.check_code(self.profile, otp.PURPOSE_VERIFY, '123456'),
+            (False, "This code has expired. Please request a new one."),
+        )
+
+    def test_code_without_any_timestamp_is_expired(self):
+        self.profile.email_verification_code = make_password('123456')
+        self.profile.code_expires_at = self.profile.code_generated_at = None
+        self.profile.save()
+        ok, _ = otp.check_code(self.profile, otp.PURPOSE_VERIFY, '123456')
+        self.assertFalse(ok)
+
+
+class CachedModelBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('ada', 'ada@example.com', 'S3cure-pass!x')
+
+    def test_cached_entry_holds_no_password_hash(self):
+        backends.CachedModelBackend().get_user(self.user.pk)
+        entry = cache.get_versioned(backends._namespace(self.user.pk), backends._cache_key())
+        self.assertNotIn(self.user.password, repr(entry))
+
+    def test_cache_hit_keeps_the_session_and_skips_auth_queries(self):
+        self.client.login(username='ada', password='S3cure-pass!x')
+        self.client.get(reverse('dashboard'))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'auth_user' in q['sql']])
+
+    def test_password_change_ends_cached_sessions(self):
+        self.client.login(username='ada', password='S3cure-pass!x')
+        self.client.get(reverse('dashboard'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('N3w-pass-abc!')
+            self.user.save()
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 302)
+
+    def test_password_change_view_keeps_the_session(self):
+        self.client.login(username='ada', password='S3cure-pass!x')
+        self.client.get(reverse('dashboard'))  # request.user now comes from the cache
+        passwords = {'old_password': 'S3cure-pass!x', 'new_password1': 'N3w-pass-abc!', 'new_password2': 'N3w-pass-abc!'}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('password_change'), passwords)
+        self.assertRedirects(response, reverse('password_change_done'), fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.assertTrue(User.objects.get(pk=self.user.pk).check_password('N3w-pass-abc!'))
+
+    def test_saving_a_cached_user_keeps_the_password(self):
+        backends.CachedModelBackend().get_user(self.user.pk)
+        user = backends.CachedModelBackend().get_user(self.user.pk)  # from the cache
+        user.first_name = 'Ada'
+        user.save()
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('S3cure-pass!x'))
+
+    def test_sessions_from_model_backend_stay_logged_in(self):
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+
+
+class DashboardDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        cls.today = timezone.localdate()
+        rows = [('50', 'Expense', 'food'), ('30', 'Expense', 'food'), ('20', 'Expense', 'transport'),
+                ('1000', 'Income', 'income')]
+        Transaction.objects.bulk_create([
+            Transaction(user=cls.user, amount=Decimal(a), type=t, category=c, date=cls.today) for a, t, c in rows
+        ])
+        for category in ('food', 'transport', 'health', 'bills', 'shopping'):
+            BudgetGoal.objects.create(user=cls.user, category=category, target_amount=Decimal('100'),
+                                      month=cls.today.month, year=cls.today.year)
+
+    def test_three_queries_whatever_the_number_of_goals(self):
+        with self.assertNumQueries(3):
+            data = services._build_dashboard_data(self.user.pk, self.today.year, self.today.month)
+        spent = {g['category']: g['actual_spent'] for g in data['goals']}
+        self.assertEqual(spent, {'bills': 0, 'food': 80, 'health': 0, 'shopping': 0, 'transport': 20})
+        self.assertEqual(data['monthly_balance'], 900)
+
+    def test_cached_read_costs_only_the_stamp(self):
+        services.get_dashboard_data(self.user.pk, self.today.year, self.today.month)
+        with CaptureQueriesContext(connection) as ctx:
+            services.get_dashboard_data(self.user.pk, self.today.year, self.today.month)
+        # At most the stamp read, which only hits the database without Redis
+        self.assertLessEqual(len(ctx.captured_queries), 1)
+        self.assertFalse([q for q in ctx.captured_queries if 'tracker_cachestamp' not in q['sql']])
+
+
+@override_settings(TIME_ZONE='Africa/Lagos')
+class JsonETagTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('ada', 'ada@example.com', 'pw'))
+
+    def get(self, url, **extra):
+        return self.client.get(url, HTTP_ACCEPT='application/json', **extra)
+
+    def test_unchanged_data_answers_304(self):
+        for url in (reverse('dashboard'), reverse('goals_list')):
+            with self.subTest(url=url):
+                etag = self.get(url)['ETag']
+                for sent in (etag, f'W/{etag}'):
+                    response = self.get(url, HTTP_IF_NONE_MATCH=sent)
+                    self.assertEqual(response.status_code, 304)
+                    self.assertEqual(response['ETag'], etag)
+
+    def test_etag_and_default_month_roll_over_together(self):
+        # 23:30 on Oct 31 in Lagos is still October; an hour later it is
+        # November there while UTC is still on Oct 31
+        october = datetime(2026, 10, 31, 22, 30, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=october) as now:
+            self.client.force_login(User.objects.get(username='ada'))  # a session that is live then
+            response = self.get(reverse('dashboard'))
+            self.assertEqual(json.loads(response.content)['data']['current_month'], 10)
+
+            now.return_value = october + timedelta(hours=1)
+            response = self.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['data']['current_month'], 11)
+
+
+class LttbTests(SimpleTestCase):
+    def test_keeps_the_ends_and_never_exceeds_the_threshold(self):
+        for n, threshold in ((10, 3), (100, 7), (1000, 90), (181, 180), (5, 10)):
+            with self.subTest(n=n, threshold=threshold):
+                values = [(i * 37) % 11 for i in range(n)]
+                picked = services._lttb_indices(values, threshold)
+                self.assertEqual(len(picked), min(n, threshold))
+                self.assertEqual((picked[0], picked[-1]), (0, n - 1))
+                self.assertEqual(picked, sorted(set(picked)))
+
+    def test_keeps_a_lone_spike(self):
+        values = [0.0] * 500
+        values[123] = 1000.0
+        self.assertIn(123, services._lttb_indices(values, 20))
+
+
+class ChartDataTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+
+    def add(self, day, amount='10', kind='Expense'):
+        Transaction.objects.create(user=self.user, amount=Decimal(amount), type=kind, category='food', date=day)
+
+    def test_quiet_buckets_are_zero_filled(self):
+        self.add(date(2026, 3, 2), '10')
+        self.add(date(2026, 3, 5), '500', 'Income')
+        series = services._build_chart_data(self.user.pk, None, None, 'day')['series']
+        self.assertEqual(series['labels'], ['2026-03-02', '2026-03-03', '2026-03-04', '2026-03-05'])
+        self.assertEqual(series['expense'], [10.0, 0.0, 0.0, 0.0])
+        self.assertEqual(series['income'], [0.0, 0.0, 0.0, 500.0])
+
+        months = services._build_chart_data(self.user.pk, None, None, 'month')['series']
+        self.assertEqual(months['labels'], ['2026-03-01'])
+
+    @override_settings(CHART_MAX_POINTS=40)
+    def test_long_ranges_are_downsampled_within_the_limit(self):
+        first = date(2025, 1, 1)
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, amount=Decimal(i % 17 + 1), type='Expense', category='food',
+                        date=first + timedelta(days=i))
+            for i in range(0, 400, 3)
+        ])
+        data = services._build_chart_data(self.user.pk, None, None, 'day')
+        series = data['series']
+        self.assertTrue(series['downsampled'])
+        self.assertLessEqual(len(series['labels']), 40)
+        self.assertEqual(series['labels'][0], first.isoformat())
+        self.assertEqual(series['labels'][-1], (first + timedelta(days=399)).isoformat())
+        # Totals come from the full series, not the kept points
+        self.assertEqual(data['total_expense'], sum(i % 17 + 1 for i in range(0, 400, 3)))
+
+
+class ExportTransactionsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        Transaction.objects.create(user=cls.user, amount=Decimal('12.50'), type='Expense', category='food',
+                                   date=date(2026, 3, 2), description='=HYPERLINK("x")')
+        Transaction.objects.create(user=cls.user, amount=Decimal('900'), type='Income', category='income',
+                                   date=date(2026, 3, 1))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('export_transactions'), params)
+        self.assertEqual(response.status_code, 200)
+        return response, b''.join(response.streaming_content)
+
+    def test_csv(self):
+        response, body = self.export()
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertRegex(response['Content-Disposition'], r'^attachment; filename="transactions-\d{4}-\d{2}-\d{2}\.csv"$')
+        lines = body.decode('utf-8').splitlines()
+        self.assertEqual(lines[0], '\ufeffDate,Type,Category,Description,Amount')
+        self.assertCountEqual(lines[1:], [
+            '2026-03-02,Expense,Food & Dining,"\'=HYPERLINK(""x"")",12.50',
+            '2026-03-01,Income,Income,,900.00',
+        ])
+
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        response, body = self.export(format='xlsx')
+        self.assertEqual(response['Content-Type'],
+                         'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.assertIn('.xlsx', response['Content-Disposition'])
+        rows = list(load_workbook(BytesIO(body), read_only=True)['Transactions'].values)
+        self.assertEqual(rows[0], ('Date', 'Type', 'Category', 'Description', 'Amount'))
+        self.assertCountEqual([(r[0].date(), *r[1:4], Decimal(str(r[4]))) for r in rows[1:]], [
+            (date(2026, 3, 2), 'Expense', 'Food & Dining', '\'=HYPERLINK("x")', Decimal('12.5')),
+            (date(2026, 3, 1), 'Income', 'Income', None, Decimal('900')),
+        ])
+
+
+class TransactionFeedTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        Transaction.objects.bulk_create([
+            Transaction(user=cls.user, amount=Decimal(i + 1), type='Expense', category='food',
+                        date=date(2026, 3, 1) + timedelta(days=i // 2))
+            for i in range(5)
+        ])
+        cls.ids = list(Transaction.objects.order_by('date', 'id').values_list('id', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def feed(self, **params):
+        response = self.client.get(reverse('transaction_feed'), params)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        chunks = list(response.streaming_content)
+        # Every chunk ends on a line boundary, so clients can parse as they go
+        self.assertTrue(all(chunk.endswith(b'\n') for chunk in chunks))
+        *rows, trailer = [json.loads(line) for line in b''.join(chunks).splitlines()]
+        return rows, trailer
+
+    def test_single_pull(self):
+        rows, trailer = self.feed()
+        self.assertEqual([r['id'] for r in rows], self.ids)
+        self.assertEqual(rows[0], {'id': self.ids[0], 'date': '2026-03-01', 'type': 'Expense',
+                                   'category': 'food', 'description': None, 'amount': '1.00'})
+        self.assertEqual(trailer, {'cursor': f'2026-03-03_{self.ids[-1]}', 'count': 5, 'done': True})
+
+    def test_paging_with_the_cursor_visits_every_row_once(self):
+        seen, params = [], {'limit': 2}
+        while True:
+            rows, trailer = self.feed(**params)
+            seen += [r['id'] for r in rows]
+            self.assertEqual(trailer['count'], len(rows))
+            if trailer['done']:
+                break
+            params['after'] = trailer['cursor']
+        self.assertEqual(seen, self.ids)
+
+    def test_chunks_split_on_line_boundaries(self):
+        Transaction.objects.bulk_create([
+            Transaction(user=self.user, amount=Decimal('1'), type='Income', category='income', date=date(2026, 4, 1))
+            for _ in range(600)
+        ])
+        rows, trailer = self.feed()
+        self.assertEqual((len(rows), trailer['count']), (605, 605))
+
+    def test_bad_parameters(self):
+        for params in ({'after': 'yesterday'}, {'after': '2026-03-01_x'}, {'limit': 0}, {'limit': 'ten'}):
+            with self.subTest(**params):
+                self.assertEqual(self.client.get(reverse('transaction_feed'), params).status_code, 400)
+
+
+class PeriodIndexTests(TestCase):
+    """Period.q() must stay a range the (user, date) indexes can seek into."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        cls.month = Period.month(2026, 10)
+
+    def plan(self, **filters):
+        return Transaction.objects.filter(self.month.q(), user_id=self.user.pk, **filters).explain()
+
+    @skipUnless(connection.vendor == 'sqlite', "SQLite query plan")
+    def test_sqlite_seeks_the_date_range(self):
+        self.assertIn('USING INDEX txn_user_date_idx (user_id=? AND date>? AND date<?)', self.plan())
+        self.assertIn(
+            'USING INDEX txn_user_type_date_idx (user_id=? AND type=? AND date>? AND date<?)',
+            self.plan(type='Expense'),
+        )
+
+    @skipUnless(connection.vendor == 'postgresql', "PostgreSQL query plan")
+    def test_postgresql_seeks_the_date_range(self):
+        with connection.cursor() as cursor:
+            # A near-empty table is cheaper to scan; ask for the index plan
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        for index, filters in (('txn_user_date_idx', {}), ('txn_user_type_date_idx', {'type': 'Expense'})):
+            plan = self.plan(**filters)
+            self.assertIn(index, plan)
+            self.assertRegex(plan, r"Index Cond: .*\(date >= '2026-10-01'::date\) AND \(date < '2026-11-01'::date\)")
+
+
+class BulkTransactionsTests(TestCase):
+    def test_blank_description_stored_like_a_single_create(self):
+        user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        single = services.create_transaction(TransactionDTO(
+            user_id=user.pk, amount=Decimal('5'), transaction_type='Expense', category='food',
+            date=timezone.localdate(), description='',
+        ))
+        item = {'amount': '5', 'type': 'Expense', 'category': 'food', 'date': str(timezone.localdate()),
+                'description': ''}
+        [created] = services.bulk_transactions(user.pk, [{'op': 'create', **item}])
+        services.bulk_transactions(user.pk, [{'op': 'update', 'id': single.pk, **item}])
+
+        descriptions = Transaction.objects.filter(pk__in=[single.pk, created['id']]).values_list('description', flat=True)
+        self.assertEqual(list(descriptions), [None, None])
+
+    def test_malformed_fields_are_reported_per_item(self):
+        user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        item = {'op': 'create', 'amount': '5', 'type': 'Expense', 'category': 'food',
+                'date': str(timezone.localdate())}
+        bad = [{**item, 'amount': 'NaN'}, {**item, 'amount': 'sNaN'}, {**item, 'description': 5},
+               {**item, 'type': ['Expense']}, {**item, 'category': {}}]
+        results = services.bulk_transactions(user.pk, [*bad, item])
+        self.assertEqual([r['status'] for r in results], ['error'] * len(bad) + ['ok'])
+        self.assertEqual(results[0]['message'], 'Invalid amount.')
+        self.assertEqual(results[2]['message'], 'Description must be text.')
+        self.assertEqual(Transaction.objects.filter(user=user).count(), 1)
+
+
+class DeltaSyncTests(TestCase):
+    T0 = datetime(2026, 6, 15, 12, 0, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+
+    def at(self, moment):
+        return mock.patch('django.utils.timezone.now', return_value=moment)
+
+    def add(self, **fields):
+        return Transaction.objects.create(**{'user': self.user, 'amount': Decimal('5'), 'type': 'Expense',
+                                             'category': 'food', 'date': date(2026, 6, 1), **fields})
+
+    def ids(self, changes):
+        return [row['id'] for row in changes['transactions']]
+
+    def test_only_rows_updated_after_the_token(self):
+        with self.at(self.T0 - timedelta(minutes=1)):
+            old, edited = self.add(), self.add()
+        with self.at(self.T0):
+            first = services.get_changes(self.user.pk)
+        self.assertTrue(first['full'])
+        self.assertEqual(self.ids(first), [old.pk, edited.pk])
+
+        with self.at(self.T0 + timedelta(minutes=10)):
+            edited.amount = Decimal('7')
+            edited.save()
+            new = self.add()
+        with self.at(self.T0 + timedelta(minutes=20)):
+            changes = services.get_changes(self.user.pk, first['token'])
+        self.assertFalse(changes['full'])
+        self.assertEqual(self.ids(changes), [edited.pk, new.pk])
+        self.assertEqual(changes['transactions'][0]['amount'], Decimal('7'))
+
+    def test_deletes_leave_tombstones(self):
+        with self.at(self.T0 - timedelta(minutes=1)):
+            single, bulk, kept = self.add(), self.add(), self.add()
+            BudgetGoal.objects.create(user=self.user, category='food', target_amount=Decimal('50'), month=5, year=2026)
+            replaced = BudgetGoal.objects.create(user=self.user, category='bills', target_amount=Decimal('80'),
+                                                 month=6, year=2026)
+        with self.at(self.T0):
+            token = services.get_changes(self.user.pk)['token']
+
+        with self.at(self.T0 + timedelta(minutes=10)):
+            services.delete_transaction(single.pk, self.user.pk)
+            services.bulk_transactions(self.user.pk, [{'op': 'delete', 'id': bulk.pk}])
+            services.import_previous_goals(ImportGoalsDTO(user_id=self.user.pk, target_month=6, target_year=2026))
+            changes = services.get_changes(self.user.pk, token)
+
+        self.assertCountEqual(changes['deleted']['transactions'], [single.pk, bulk.pk])
+        self.assertEqual(changes['deleted']['goals'], [replaced.pk])
+        # The imported copy is new, so it arrives as an upsert
+        self.assertEqual([g['category'] for g in changes['goals']], ['food'])
+        self.assertEqual(self.ids(changes), [])
+        self.assertTrue(Transaction.objects.filter(pk=kept.pk).exists())
+
+    @override_settings(SYNC_TOKEN_OVERLAP=0)
+    def test_row_updated_at_the_token_is_sent_once(self):
+        with self.at(self.T0 - timedelta(microseconds=1)):
+            before = self.add()
+        with self.at(self.T0):
+            first = services.get_changes(self.user.pk)
+            on_boundary = self.add()  # commits after the read that made the token
+        self.assertEqual(self.ids(first), [before.pk])
+
+        with self.at(self.T0 + timedelta(minutes=1)):
+            second = services.get_changes(self.user.pk, first['token'])
+            third = services.get_changes(self.user.pk, second['token'])
+        self.assertEqual(self.ids(second), [on_boundary.pk])
+        self.assertEqual(self.ids(third), [])
+
+    def test_token_overlaps_the_previous_read(self):
+        with self.at(self.T0):
+            token = services.get_changes(self.user.pk)['token']
+        self.assertEqual(int(token), int((self.T0 - timedelta(seconds=5)).timestamp() * 1_000_000))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ApiHandlerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+
+    def get(self, path, **extra):
+        request = RequestFactory().get(path, HTTP_AUTHORIZATION=f'Bearer {issue_token(self.user)}', **extra)
+        return ApiHandler().get_response(request)
+
+    def test_serves_the_api_on_the_trimmed_stack(self):
+        response = self.get('/api/v1/transactions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['data'], [])
+
+    def test_rejects_hosts_outside_allowed_hosts(self):
+        response = self.get('/api/v1/transactions/', HTTP_HOST='evil.example')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response['Content-Type'], 'application/json')
+
+
+class ApiMonthParamTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+
+    def get(self, path, **params):
+        return self.client.get(path, params, HTTP_AUTHORIZATION=f'Bearer {issue_token(self.user)}')
+
+    def test_out_of_range_months_are_rejected(self):
+        for path in ('/api/v1/dashboard/', '/api/v1/home/', '/api/v1/goals/'):
+            for params in ({'year': 0}, {'year': 10000}, {'year': 9999, 'month': 12}, {'month': 13}):
+                with self.subTest(path=path, **params):
+                    self.assertEqual(self.get(path, **params).status_code, 400)
+
+    def test_last_representable_month_is_served(self):
+        self.assertEqual(self.get('/api/v1/dashboard/', year=9999, month=11).status_code, 200)
+
+
+class ApiTransactionValidationTests(TestCase):
+    PAYLOAD = {'amount': '5', 'type': 'Expense', 'category': 'food', 'date': '2026-03-01'}
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('ada', 'ada@example.com', 'pw')
+        cls.txn = Transaction.objects.create(user=cls.user, amount=Decimal('5'), type='Expense',
+                                             category='food', date=date(2026, 3, 1))
+
+    def send(self, method, path, payload):
+        return getattr(self.client, method)(path, json.dumps(payload), content_type='application/json',
+                                            HTTP_AUTHORIZATION=f'Bearer {issue_token(self.user)}')
+
+    def test_malformed_fields_are_400_json(self):
+        for field, value in (('amount', 'NaN'), ('amount', 'Infinity'), ('amount', [5]), ('description', 5),
+                             ('type', ['Expense']), ('category', {}), ('date', 20260301)):
+            for method, path in (('post', '/api/v1/transactions/'), ('put', f'/api/v1/transactions/{self.txn.pk}/')):
+                with self.subTest(field=field, value=value, method=method):
+                    response = self.send(method, path, {**self.PAYLOAD, field: value})
+                    self.assertEqual(response.status_code, 400)
+                    self.assertEqual(json.loads(response.content)['status'], 'error')
+        self.assertEqual(Transaction.objects.get().pk, self.txn.pk)
+
+    def test_valid_payload_is_created(self):
+        response = self.send('post', '/api/v1/transactions/', self.PAYLOAD)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.content)['data']['amount'], '5.00')
+
+
+class GoalsListTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('ada', 'ada@example.com', 'pw'))
+
+    def test_out_of_range_months_fall_back_to_this_month(self):
+        for url in ('/goals/10000/1/', '/goals/9999/12/', '/goals/?year=99999', '/goals/?month=13'):
+            for accept in ('text/html', 'application/json'):
+                with self.subTest(url=url, accept=accept):
+                    self.assertEqual(self.client.get(url, HTTP_ACCEPT=accept).status_code, 200)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    BODY = b'<p>balance</p>' * 200
+
+    def compress(self, path, method='get'):
+        request = getattr(RequestFactory(), method)(path, HTTP_ACCEPT_ENCODING='br, gzip')
+        fake_brotli = SimpleNamespace(MODE_TEXT=0, compress=lambda data, mode, quality: b'brotli')
+        with mock.patch.object(middleware, 'brotli', fake_brotli):
+            return middleware.CompressionMiddleware(lambda r: HttpResponse(self.BODY))(request)
+
+    def test_brotli_for_pages_without_request_input(self):
+        self.assertEqual(self.compress('/dashboard/')['Content-Encoding'], 'br')
+
+    def test_padded_gzip_when_the_page_may_reflect_input(self):
+        for path, method in (('/transactions/?q=salary', 'get'), ('/transactions/', 'post')):
+            with self.subTest(path=path, method=method):
+                self.assertEqual(self.compress(path, method)['Content-Encoding'], 'gzip')
+        sizes = {len(self.compress('/transactions/?q=salary').content) for _ in range(20)}
+        self.assertGreater(len(sizes), 1)
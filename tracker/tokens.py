@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core import signing
+from django.utils.crypto import constant_time_compare
+
+from .backends import CachedModelBackend
+
+# Bearer tokens for /api/v1/. Stateless: the token is the signed user id plus
+# a slice of the session auth hash, so nothing is stored server-side and a
+# password change revokes every token issued before it, like it logs out
+# every session.
+_SALT = 'tracker.api.token'
+
+_backend = CachedModelBackend()
+
+
+def issue_token(user) -> str:
+    return signing.dumps({'uid': user.pk, 'ph': user.get_session_auth_hash()[:16]}, salt=_SALT)
+
+
+def user_for_token(token: str):
+    """The active user token was issued to, or None if it is bad, expired or revoked."""
+    try:
+        payload = signing.loads(token, salt=_SALT, max_age=getattr(settings, 'API_TOKEN_MAX_AGE', 30 * 86400))
+    except signing.BadSignature:
+        return None
+
+    # Served from the versioned user cache, see backends.py
+    user = _backend.get_user(payload.get('uid'))
+    if user is None or not constant_time_compare(payload.get('ph', ''), user.get_session_auth_hash()[:16]):
+        return None
+    return user
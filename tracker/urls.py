@@ -15,7 +15,12 @@ urlpatterns = [
     path('transaction/<int:pk>/edit/', views.edit_transaction, name='edit_transaction'),#
     path('transaction/delete/<int:pk>/', views.delete_transaction, name='delete_transaction'),#
     path('tools/audit/', views.subscription_audit_view, name='audit'),
+    path('ai/jobs/<uuid:job_id>/', views.ai_job_status, name='ai_job_status'),
     path('transactions/import/', views.import_transactions, name='import_csv'),
+    path('transactions/export/', views.export_transactions, name='export_transactions'),
+    path('transactions/feed/', views.transaction_feed, name='transaction_feed'),
+    path('transactions/bulk/', views.bulk_transactions, name='bulk_transactions'),
+    path('sync/changes/', views.sync_changes, name='sync_changes'),
 
     path('goals/', views.goals_list, name='goals_list'),#
     path('goals/<int:year>/<int:month>/', views.goals_list, name='goals_history'),#
@@ -12,47 +12,60 @@ def is_json_request(request):
     return 'application/json' in accept or 'application/json' in content_type
 
 
+def get_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    return x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
+
+
 def send_async_email(to_email: str, subject: str, html_content: str) -> bool:
     """
-    Sends an email via Resend HTTP API.
+    Queues an email in the outbox and returns immediately — delivery happens
+    on the outbox worker (see tracker/outbox.py), so the request never waits
+    on Resend or SMTP.
+
+    Returns True once queued, False if it couldn't be queued (never raises —
+    safe to call anywhere).
+    """
+    from .outbox import enqueue_email
+
+    try:
+        enqueue_email(to_email, subject, html_content)
+        return True
+    except Exception as e:
+        logger.error("Could not queue email to %s: %s", to_email, e)
+        return False
+
+
+def deliver_email(to_email: str, subject: str, html_content: str) -> None:
+    """
+    Sends an email synchronously. Only the outbox worker calls this.
 
     In production: uses Resend (fast HTTP call, reliable, no SMTP timeout).
     In dev (DEBUG=True): falls back to Django's configured email backend (Gmail SMTP).
 
-    Returns True on success, False on failure (never raises — safe to call anywhere).
+    Raises on failure so the worker can schedule a retry.
     """
     if settings.DEBUG:
         # Dev fallback — use whatever Django email backend is configured
-        try:
-            from django.core.mail import EmailMultiAlternatives
-            msg = EmailMultiAlternatives(
-                subject=subject,
-                body="Please view this email in an HTML-compatible client.",
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                to=[to_email],
-            )
-            msg.attach_alternative(html_content, "text/html")
-            msg.send(fail_silently=False)
-            return True
-        except Exception as e:
-            logger.error("Dev email failed to %s: %s", to_email, e)
-            return False
+        from django.core.mail import EmailMultiAlternatives
+        msg = EmailMultiAlternatives(
+            subject=subject,
+            body="Please view this email in an HTML-compatible client.",
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[to_email],
+        )
+        msg.attach_alternative(html_content, "text/html")
+        msg.send(fail_silently=False)
+        return
 
     # Production — Resend HTTP API
-    try:
-        resend.api_key = settings.RESEND_API_KEY
-        if not resend.api_key:
-            logger.error("RESEND_API_KEY is not set — email not sent to %s", to_email)
-            return False
-
-        resend.Emails.send({
-            "from": settings.DEFAULT_FROM_EMAIL,
-            "to": [to_email],
-            "subject": subject,
-            "html": html_content,
-        })
-        return True
+    resend.api_key = settings.RESEND_API_KEY
+    if not resend.api_key:
+        raise RuntimeError("RESEND_API_KEY is not set")
 
-    except Exception as e:
-        logger.error("Resend email failed to %s: %s", to_email, e)
-        return False
\ No newline at end of file
+    resend.Emails.send({
+        "from": settings.DEFAULT_FROM_EMAIL,
+        "to": [to_email],
+        "subject": subject,
+        "html": html_content,
+    })
@@ -7,8 +7,9 @@ import logging
 from .ai_services import audit_subscriptions_stream
 
 import os
+import tempfile
 import uuid
-from .utils import send_async_email
+from .utils import get_ip, send_async_email
 from datetime import datetime, timedelta
 from collections import defaultdict
 from decimal import Decimal
@@ -21,9 +22,10 @@ from django.contrib.auth.views import PasswordResetView
 from django.contrib.auth.forms import SetPasswordForm
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.tokens import PasswordResetTokenGenerator
-from django.http import JsonResponse, StreamingHttpResponse
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.utils import timezone
 from django.utils.encoding import force_str
+from django.utils.cache import patch_vary_headers
 from django.utils.http import urlsafe_base64_decode
 from django.core.cache import cache
 from django.db.models import Sum, Q
@@ -34,8 +36,13 @@ from django.core.files.storage import default_storage
 from django.db import transaction
 from .models import Transaction, BudgetGoal, UserProfile, BudgetLock
 from .forms import SignUpForm, BudgetGoalForm, ProfileUpdateForm, TransactionForm, CSVUploadForm, CustomPasswordResetForm
-from . import services, schemas
-from .ratelimit import check_ratelimit, RateLimitError
+from . import services, schemas, jobs
+from .decorators import json_etag
+from .handlers import API_PREFIX
+from .responses import FastJsonResponse, dumps as dump_json
+from .periods import Period
+from .queries import filter_transactions
+from .ratelimit import check_ratelimit, get_ratelimit_usage, reset_ratelimit, RateLimitError
 from .ai_services import scan_receipt
 from .ai_services import audit_subscriptions
 from openpyxl import load_workbook
@@ -48,17 +55,30 @@ User = get_user_model()
 @require_http_methods(["GET", "POST", "HEAD"])
 def health(request):
     """Health check endpoint for uptime monitoring. Allows GET, POST, HEAD."""
-    return JsonResponse({'status': 'ok'})
-
-def get_ip(request):
-    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-    return x_forwarded_for.split(',')[0] if x_forwarded_for else request.META.get('REMOTE_ADDR')
+    return FastJsonResponse({'status': 'ok'})
 
 def is_json_request(request):
     accept = request.headers.get('Accept', '')
     return 'application/json' in accept and 'text/html' not in accept
 
 
+def _fragment_cache_context(user_id):
+    """
+    Context for {% cache %} blocks over per-user data: the data version every
+    write in services.py bumps, so a write retires all of the user's cached
+    fragments at once, and how long an untouched fragment may live.
+    """
+    return {
+        'data_version': services.get_data_version(user_id),
+        'fragment_timeout': getattr(settings, 'DATA_CACHE_TIMEOUT', 86400),
+    }
+
+
+def is_fragment_request(request):
+    """The page's own JS asking for a partial (htmx-style HX-Request header)."""
+    return request.headers.get('HX-Request') == 'true'
+
+
 def login_view(request):
     ip = get_ip(request)
 
@@ -70,7 +90,7 @@ def login_view(request):
             check_ratelimit(ratelimit_key, limit=10, period=60)
         except RateLimitError as e:
             if is_json_request(request):
-                return JsonResponse({'error': str(e)}, status=429)
+                return FastJsonResponse({'error': str(e)}, status=429)
             messages.error(request, str(e))
             return render(request, 'tracker/login.html')
     else:
@@ -85,16 +105,14 @@ def login_view(request):
 
         if status == "success":
             login(request, user)
-            cache.delete(f"ratelimit:{ratelimit_key}")
+            reset_ratelimit(ratelimit_key, period=60)
             
             if is_json_request(request):
-                return JsonResponse({'status': 'success', 'user': user.username})
+                return FastJsonResponse({'status': 'success', 'user': user.username})
             return redirect('dashboard')
 
         else:
-            attempts_used = cache.get(f"ratelimit:{ratelimit_key}", 0)
-            if not isinstance(attempts_used, int):
-                attempts_used = 0
+            attempts_used = get_ratelimit_usage(ratelimit_key, period=60)
             remaining = max(0, 10 - attempts_used)
             
             error_msg = "Invalid credentials."
@@ -105,7 +123,7 @@ def login_view(request):
                 error_msg += f" Warning: {remaining} attempts remaining."
             
             if is_json_request(request):
-                return JsonResponse({'status': 'error', 'code': status, 'message': error_msg}, status=401)
+                return FastJsonResponse({'status': 'error', 'code': status, 'message': error_msg}, status=401)
 
             messages.error(request, error_msg)
             
@@ -123,7 +141,7 @@ def register_view(request):
             check_ratelimit(f"reg_ip_{get_ip(request)}", limit=50, period=3600)
         except RateLimitError as e:
             if is_json_request(request): 
-                return JsonResponse({'status': 'error', 'message': str(e)}, status=429)
+                return FastJsonResponse({'status': 'error', 'message': str(e)}, status=429)
             messages.error(request, str(e))
             return redirect('login')
 
@@ -132,7 +150,7 @@ def register_view(request):
             try:
                 data = json.loads(request.body)
             except json.JSONDecodeError:
-                return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
         else:
             data = request.POST
         
@@ -154,7 +172,7 @@ def register_view(request):
                 request.session['unverified_user_id'] = user.id
 
                 if is_json_request(request):
-                    return JsonResponse({
+                    return FastJsonResponse({
                         'status': 'success', 
                         'message': 'User registered successfully. Check email for code.',
                         'email': user.email
@@ -165,11 +183,11 @@ def register_view(request):
 
             except services.ServiceError as e:
                 if is_json_request(request): 
-                    return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                    return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
                 messages.error(request, str(e))
         else:
             if is_json_request(request):
-                return JsonResponse({
+                return FastJsonResponse({
                     'status': 'error',
                     'message': 'Validation failed',
                     'errors': form.errors
@@ -178,7 +196,7 @@ def register_view(request):
 
     else:
         if is_json_request(request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'success',
                 'message': 'Register endpoint ready.',
                 'method': 'POST'
@@ -194,7 +212,7 @@ def verify_registration(request):
     
     if not user_id:
         if is_json_request(request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'error', 
                 'message': 'No registration session found. Please register first.'
             }, status=401)
@@ -207,7 +225,7 @@ def verify_registration(request):
         request.session.flush()
         
         if is_json_request(request):
-            return JsonResponse({'status': 'error', 'message': 'User not found. Register again.'}, status=404)
+            return FastJsonResponse({'status': 'error', 'message': 'User not found. Register again.'}, status=404)
             
         return redirect('register')
 
@@ -218,7 +236,7 @@ def verify_registration(request):
             success, msg = services.verify_code(dto, acting_user_id=user_id)
 
             if is_json_request(request):
-                return JsonResponse({'status': 'success', 'message': msg})
+                return FastJsonResponse({'status': 'success', 'message': msg})
 
             if success:
                 messages.success(request, msg)
@@ -227,11 +245,11 @@ def verify_registration(request):
 
         except services.ServiceError as e:
             if is_json_request(request): 
-                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
             messages.error(request, str(e))
 
     if is_json_request(request):
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'success',
             'message': 'Verification endpoint ready.',
             'email_to_verify': user_email,
@@ -247,17 +265,17 @@ def resend_code(request):
     
     if not user_id:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': 'Session expired. Register again.'}, status=401)
+            return FastJsonResponse({'status': 'error', 'message': 'Session expired. Register again.'}, status=401)
         return redirect('register')
     
     if request.method == "GET" and is_json_request(request):
-        return JsonResponse({'status': 'ready', 'message': 'Send POST to resend code.'})
+        return FastJsonResponse({'status': 'ready', 'message': 'Send POST to resend code.'})
 
     cache_key = f"resend_code_cooldown_{user_id}"
     if cache.get(cache_key):
         msg = "Please wait a minute before requesting another code."
         if is_json_request(request):
-            return JsonResponse({'status': 'error', 'message': msg}, status=429)
+            return FastJsonResponse({'status': 'error', 'message': msg}, status=429)
         messages.warning(request, msg)
         return redirect('verify_registration')
 
@@ -270,13 +288,13 @@ def resend_code(request):
         cache.set(cache_key, True, 60)
         
         if is_json_request(request): 
-            return JsonResponse({'status': 'success', 'message': 'Code resent'})
+            return FastJsonResponse({'status': 'success', 'message': 'Code resent'})
         
         messages.success(request, "Code resent.")
         
     except Exception as e:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
         messages.error(request, str(e))
         
     return redirect('verify_registration')
@@ -288,7 +306,7 @@ def verify_email_change(request):
     
     if not user.is_authenticated:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+            return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     if request.method == 'POST':
@@ -309,23 +327,23 @@ def verify_email_change(request):
             
             if success:
                 if is_json_request(request):
-                    return JsonResponse({'status': 'success', 'message': msg})
+                    return FastJsonResponse({'status': 'success', 'message': msg})
             
                 messages.success(request, msg)
                 return redirect('profile')
             else:
                 if is_json_request(request):
-                    return JsonResponse({'status': 'error', 'message': msg}, status=400)
+                    return FastJsonResponse({'status': 'error', 'message': msg}, status=400)
                 messages.error(request, msg)
                 return redirect('verify_email_change')
         except Exception as e:
             if is_json_request(request): 
-                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
             messages.error(request, str(e))
             return redirect('verify_email_change')
 
     if is_json_request(request):
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'ready', 
             'message': 'Send POST with "code" to verify email change.'
         })
@@ -339,7 +357,7 @@ def password_change_view(request):
     
     if not user.is_authenticated:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+            return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     if request.method == 'POST':
@@ -367,7 +385,7 @@ def password_change_view(request):
                 update_session_auth_hash(request, request.user)
                 
                 if is_json_request(request): 
-                    return JsonResponse({'status': 'success', 'message': msg})
+                    return FastJsonResponse({'status': 'success', 'message': msg})
                 
                 messages.success(request, msg)
                 return redirect('password_change_done')
@@ -376,11 +394,11 @@ def password_change_view(request):
                 raise ValueError(msg)
         except ValueError as e:
             if is_json_request(request): 
-                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
             messages.error(request, str(e))            
 
     if is_json_request(request):
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'ready', 
             'required_fields': ['old_password', 'new_password', 'confirm_new_password']
         })
@@ -394,7 +412,7 @@ def delete_account_view(request):
     
     if not user.is_authenticated:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+            return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     if request.method == 'POST':
@@ -404,18 +422,18 @@ def delete_account_view(request):
             logout(request)
             
             if is_json_request(request): 
-                return JsonResponse({'status': 'success', 'message': 'Account deleted'})
+                return FastJsonResponse({'status': 'success', 'message': 'Account deleted'})
             
             messages.info(request, "Account deleted.")
             return redirect('register')
             
         except Exception as e:
             if is_json_request(request): 
-                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
             messages.error(request, str(e))
 
     if is_json_request(request):
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'warning', 
             'message': 'Send POST with "password" to PERMANENTLY delete account.'
         })
@@ -426,7 +444,7 @@ def delete_account_view(request):
 @require_POST
 def logout_view(request):
     logout(request)
-    if is_json_request(request): return JsonResponse({'status': 'logged_out'})
+    if is_json_request(request): return FastJsonResponse({'status': 'logged_out'})
     return redirect('login')
 
 
@@ -456,7 +474,7 @@ class CustomPasswordResetView(PasswordResetView):
             check_ratelimit(f"pwd_reset_{ip}", limit=5, period=3600)
         except RateLimitError as e:
             if is_json_request(request):
-                return JsonResponse({'status': 'error', 'message': str(e)}, status=429)
+                return FastJsonResponse({'status': 'error', 'message': str(e)}, status=429)
             messages.error(request, str(e))
             return redirect('password_reset')
         return super().dispatch(request, *args, **kwargs)
@@ -475,7 +493,7 @@ class CustomPasswordResetView(PasswordResetView):
         except Exception as exc:
             logger.exception("Password reset form.save() failed: %s", exc)
             if is_json_request(self.request):
-                return JsonResponse({
+                return FastJsonResponse({
                     'status': 'error',
                     'message': 'Could not send reset email. Please try again shortly.'
                 }, status=503)
@@ -483,7 +501,7 @@ class CustomPasswordResetView(PasswordResetView):
             return redirect('password_reset')
 
         if is_json_request(self.request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'success',
                 'message': 'Password reset instructions have been sent to your email.'
             })
@@ -494,7 +512,7 @@ class CustomPasswordResetView(PasswordResetView):
 
     def form_invalid(self, form):
         if is_json_request(self.request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'error',
                 'errors': form.errors
             }, status=400)
@@ -504,7 +522,7 @@ class CustomPasswordResetView(PasswordResetView):
 class CustomPasswordResetDoneView(auth_views.PasswordResetDoneView):
     def get(self, request, *args, **kwargs):
         if is_json_request(request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'success',
                 'message': 'Password reset instructions have been sent to your email.'
             })
@@ -535,7 +553,7 @@ class CustomPasswordResetConfirmView(auth_views.PasswordResetConfirmView):
         # self.validlink is set automatically by Django before this method runs
         if not self.validlink:
             if self._wants_json(request):
-                return JsonResponse({
+                return FastJsonResponse({
                     'status': 'error', 
                     'message': 'The password reset link is invalid or has expired.'
                 }, status=400)
@@ -547,7 +565,7 @@ class CustomPasswordResetConfirmView(auth_views.PasswordResetConfirmView):
     def form_valid(self, form):
         form.save()
         if self._wants_json(self.request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'success', 
                 'message': 'Password has been reset successfully.'
             })
@@ -556,7 +574,7 @@ class CustomPasswordResetConfirmView(auth_views.PasswordResetConfirmView):
     def form_invalid(self, form):
         # This catches missing fields (like missing new_password1)
         if self._wants_json(self.request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'error', 
                 'errors': form.errors
             }, status=400)
@@ -569,16 +587,16 @@ def password_reset_confirm_api(request, uidb64, token):
         uid = force_str(urlsafe_base64_decode(uidb64))
         user = get_user_model().objects.get(pk=uid)
     except (TypeError, ValueError, OverflowError, User.DoesNotExist):
-        return JsonResponse({'status': 'error', 'message': 'Invalid user.'}, status=400)
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid user.'}, status=400)
 
     if not PasswordResetTokenGenerator().check_token(user, token):
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'error',
             'message': 'Password reset link is invalid or has expired.'
         }, status=400)
 
     if request.method == "GET":
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'success',
             'message': 'Token is valid.',
             'action': 'Submit POST with "new_password1" and "new_password2"'
@@ -595,17 +613,17 @@ def password_reset_confirm_api(request, uidb64, token):
     form = SetPasswordForm(user, data=data)
     if form.is_valid():
         form.save()
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'success',
             'message': 'Password has been reset successfully.'
         })
 
-    return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+    return FastJsonResponse({'status': 'error', 'errors': form.errors}, status=400)
 
 class CustomPasswordResetCompleteView(auth_views.PasswordResetCompleteView):
     def get(self, request, *args, **kwargs):
         if is_json_request(request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'success',
                 'message': 'Password reset complete. You may now log in.'
             })
@@ -613,117 +631,51 @@ class CustomPasswordResetCompleteView(auth_views.PasswordResetCompleteView):
 
 @login_required
 @require_GET
+@json_etag
 def dashboard(request):
     user = request.user
     if not user.is_authenticated:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+            return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
-    now = timezone.now()
+    # Local date, like json_etag's fingerprint: the ETag rolls over with the month it names
+    now = timezone.localdate()
     current_month = now.month
-    current_year = now.year
-    
-    goals = BudgetGoal.objects.filter(user=user, month=current_month, year=current_year)
-    
-
-    expense_qs = Transaction.objects.filter(
-        user=user, 
-        type='Expense', 
-        date__month=current_month, 
-        date__year=current_year
-    ).values('category').annotate(total=Sum('amount'))
-    
-    expense_map = {i['category']: i['total'] for i in expense_qs}
-
-    goal_progress = []
-    for goal in goals:
-        spent = expense_map.get(goal.category, Decimal('0.00'))
-        target = goal.target_amount
-        
-        goal.actual_spent = spent
-        goal.progress_percent = (spent / target) * 100 if target > 0 else 0
-        goal.remaining = target - spent
-        
-        if target > 0:
-            goal.percent = min(int((spent / target) * 100), 100)
-            real_percent = (spent / target) * 100 
-        else:
-            goal.percent = 0
-            real_percent = 0
-
-        if real_percent > 100:
-            goal.status = 'exceeded'
-        elif real_percent >= 80:
-            goal.status = 'warning'
-        else:
-            goal.status = 'good'
-            
-        goal_progress.append(goal)
-
-    recent_transactions = Transaction.objects.filter(user=user).order_by('-date', '-id')[:5]
-
-    # Monthly totals
-    monthly_totals = Transaction.objects.filter(
-        user=user,
-        date__month=current_month,
-        date__year=current_year
-    ).aggregate(
-        income=Sum('amount', filter=Q(type='Income')),
-        expense=Sum('amount', filter=Q(type='Expense'))
-    )
-    
-    monthly_income = monthly_totals['income'] or Decimal('0.00')
-    monthly_expense = monthly_totals['expense'] or Decimal('0.00')
-    monthly_balance = monthly_income - monthly_expense
-
-    # Overall totals (all-time)
-    overall_totals = Transaction.objects.filter(user=user).aggregate(
-        income=Sum('amount', filter=Q(type='Income')),
-        expense=Sum('amount', filter=Q(type='Expense'))
-    )
-    
-    total_income = overall_totals['income'] or Decimal('0.00')
-    total_expense = overall_totals['expense'] or Decimal('0.00')
-    balance = total_income - total_expense
+    fragment_cache = _fragment_cache_context(user.id)
+    data = services.get_dashboard_data(user.id, now.year, current_month, stamp=fragment_cache['data_version'])
 
     if is_json_request(request):
         json_goals = [{
-            'category': g.get_category_display(),
-            'target': float(g.target_amount),
-            'spent': float(g.actual_spent),
-            'percent': g.percent,
-            'status': g.status
-        } for g in goal_progress]
-        
-        json_trans = list(recent_transactions.values('id', 'amount', 'type', 'category', 'date'))
-        
-        return JsonResponse({
+            'category': g['category_display'],
+            'target': float(g['target_amount']),
+            'spent': float(g['actual_spent']),
+            'percent': g['percent'],
+            'status': g['status']
+        } for g in data['goals']]
+
+        json_trans = [
+            {k: t[k] for k in ('id', 'amount', 'type', 'category', 'date')}
+            for t in data['recent_transactions']
+        ]
+
+        return FastJsonResponse({
             'status': 'success',
             'data': {
                 'current_month': current_month,
-                'total_income': float(total_income),
-                'total_expense': float(total_expense),
-                'balance': float(balance),
-                'monthly_income': float(monthly_income),
-                'monthly_expense': float(monthly_expense),
-                'monthly_balance': float(monthly_balance),
+                'total_income': float(data['total_income']),
+                'total_expense': float(data['total_expense']),
+                'balance': float(data['balance']),
+                'monthly_income': float(data['monthly_income']),
+                'monthly_expense': float(data['monthly_expense']),
+                'monthly_balance': float(data['monthly_balance']),
                 'goal_progress': json_goals,
+                'category_expenses': {k: float(v) for k, v in data['expense_by_category'].items()},
                 'transactions': json_trans
             }
         })
 
-    context = {
-        'recent_transactions': recent_transactions,
-        'goals': goal_progress,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'balance': balance,
-        'monthly_income': monthly_income,
-        'monthly_expense': monthly_expense,
-        'monthly_balance': monthly_balance,
-        'current_month': now,
-    }
+    context = dict(data, current_month=now, **fragment_cache)
 
     return render(request, "tracker/dashboard.html", context)
 
@@ -739,38 +691,19 @@ def landing(request):
 
 @login_required
 @require_GET
+@json_etag
 def transaction_list(request):
     user = request.user
     if not user.is_authenticated:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+            return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
     
-    all_transactions = Transaction.objects.filter(user=user).order_by('-date', '-id')
-
-    query = request.GET.get('q') 
-    category_filter = request.GET.get('category')
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-
-    if query:
-        all_transactions = all_transactions.filter(description__icontains=query)
-
-    if category_filter and category_filter != 'All':
-        all_transactions = all_transactions.filter(category=category_filter)
-
-    if start_date:
-        try:
-            start_date_obj = datetime.strptime(start_date, '%Y-%m-%d').date()
-            if end_date:
-                end_date_obj = datetime.strptime(end_date, '%Y-%m-%d').date()
-            else:
-                # Default to today so a "from" date always gives a full range
-                end_date_obj = datetime.today().date()
-                end_date = end_date_obj.strftime('%Y-%m-%d')
-            all_transactions = all_transactions.filter(date__range=[start_date_obj, end_date_obj])
-        except ValueError:
-            pass
+    all_transactions, filters = filter_transactions(request, user)
+    query = filters['query']
+    category_filter = filters['category']
+    start_date = filters['start_date']
+    end_date = filters['end_date']
 
     paginator = Paginator(all_transactions, 20)
     page_number = request.GET.get('page')
@@ -794,7 +727,7 @@ def transaction_list(request):
             'id', 'date', 'description', 'amount', 'category', 'type'
         ))
         
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'success',
             'data': {
                 'transactions': transactions_data,
@@ -818,44 +751,222 @@ def transaction_list(request):
                 }
             }
         })
-    categories = Transaction.CATEGORY_CHOICES
+    filter_params = request.GET.copy()
+    filter_params.pop('page', None)
 
-    return render(request, 'tracker/transaction_list.html', {
+    context = {
+        'filter_query': filter_params.urlencode(),
         'transactions': transactions_page,
-        'categories': categories,      
-        'current_category': category_filter, 
-        'current_query': query,        
-        'current_start_date': start_date, 
-        'current_end_date': end_date,   
+        'current_category': category_filter,
+        'current_query': query,
+        'current_start_date': start_date,
+        'current_end_date': end_date,
         'total_income_period': total_income,
         'total_expense_period': total_expense,
         'total_balance_period': total_income - total_expense
-    })
+    }
+
+    if is_fragment_request(request):
+        # Summary, table and pagination only — no base layout, nav or modals
+        response = render(request, 'tracker/partials/transaction_results.html', context)
+    else:
+        context['categories'] = Transaction.CATEGORY_CHOICES
+        response = render(request, 'tracker/transaction_list.html', context)
+    patch_vary_headers(response, ('HX-Request',))
+    return response
+
+
+EXPORT_COLUMNS = ('Date', 'Type', 'Category', 'Description', 'Amount')
+
+
+def _export_rows(qs):
+    """Export rows straight off a server-side cursor, never the full list."""
+    labels = dict(Transaction.CATEGORY_CHOICES)
+    rows = qs.values_list('date', 'type', 'category', 'description', 'amount').iterator(
+        chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    )
+    for day, txn_type, category, description, amount in rows:
+        yield day, txn_type, labels.get(category, category), description or '', amount
+
+
+def _spreadsheet_safe(value):
+    # Text starting with one of these runs as a formula in Excel/Sheets
+    if isinstance(value, str) and value[:1] in ('=', '+', '-', '@'):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, for csv.writer."""
+    def write(self, value):
+        return value
 
-from . import schemas, services
+
+@login_required
+@require_GET
+def export_transactions(request):
+    """
+    Downloads the transactions matching the list filters as ?format=csv
+    (default) or xlsx. CSV is streamed row by row as the cursor advances;
+    XLSX is written in openpyxl's write_only mode to a temporary file that is
+    then streamed, so memory stays flat however many rows there are.
+    """
+    user = request.user
+    try:
+        check_ratelimit(f"export_{user.id}", limit=10, period=300)
+    except RateLimitError as e:
+        if is_json_request(request):
+            return FastJsonResponse({'status': 'error', 'message': str(e)}, status=429)
+        messages.error(request, str(e))
+        return redirect('transactions')
+
+    qs, _ = filter_transactions(request, user)
+    export_format = request.GET.get('format', 'csv')
+    filename = f"transactions-{timezone.localdate():%Y-%m-%d}"
+
+    if export_format == 'xlsx':
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet('Transactions')
+        sheet.append(EXPORT_COLUMNS)
+        for day, txn_type, category, description, amount in _export_rows(qs):
+            sheet.append((day, txn_type, category, _spreadsheet_safe(description), amount))
+
+        tmp = tempfile.TemporaryFile()
+        workbook.save(tmp)
+        tmp.seek(0)
+        return FileResponse(
+            tmp, as_attachment=True, filename=f"{filename}.xlsx",
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    if export_format != 'csv':
+        return FastJsonResponse({'status': 'error', 'message': 'format must be csv or xlsx.'}, status=400)
+
+    writer = csv.writer(_Echo())
+
+    def stream():
+        # BOM so Excel opens the UTF-8 file with the right encoding
+        yield '\ufeff' + writer.writerow(EXPORT_COLUMNS)
+        # A few hundred lines per chunk: one write per row would spend more
+        # time in the WSGI server than in the database
+        lines = []
+        for row in _export_rows(qs):
+            lines.append(writer.writerow([_spreadsheet_safe(v) for v in row]))
+            if len(lines) >= 500:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+def _parse_feed_cursor(cursor):
+    """'<YYYY-MM-DD>_<id>' -> (date, id); raises ValueError."""
+    day, _, pk = cursor.partition('_')
+    return datetime.strptime(day, '%Y-%m-%d').date(), int(pk)
+
+
+@login_required
+@require_GET
+def transaction_feed(request):
+    """
+    All of the user's transactions as newline-delimited JSON, oldest first in
+    (date, id) order, streamed off a DB iterator. ?after=<cursor> resumes
+    after a previous line; ?limit= caps the rows. The last line is always
+    {"cursor": ..., "count": ..., "done": ...} — pass its cursor back as
+    ?after= to continue an interrupted or limited pull.
+    """
+    user = request.user
+    qs = Transaction.objects.filter(user=user).order_by('date', 'id')
+
+    try:
+        after = request.GET.get('after')
+        if after:
+            day, pk = _parse_feed_cursor(after)
+            qs = qs.filter(Q(date__gt=day) | Q(date=day, id__gt=pk))
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+        if limit is not None and limit < 1:
+            raise ValueError
+    except ValueError:
+        return FastJsonResponse({'status': 'error', 'message': 'after must be <YYYY-MM-DD>_<id>, limit a positive integer.'}, status=400)
+
+    if limit:
+        # One extra row tells us whether anything is left
+        qs = qs[:limit + 1]
+
+    rows = qs.values_list('id', 'date', 'type', 'category', 'description', 'amount').iterator(
+        chunk_size=getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+    )
+
+    def stream():
+        count, cursor, done, lines = 0, after, True, []
+        for pk, day, txn_type, category, description, amount in rows:
+            if limit and count == limit:
+                done = False
+                break
+            day = day.isoformat()
+            lines.append(dump_json({
+                'id': pk, 'date': day, 'type': txn_type, 'category': category,
+                'description': description, 'amount': str(amount),
+            }))
+            count += 1
+            cursor = f"{day}_{pk}"
+            if len(lines) >= 500:
+                yield b'\n'.join(lines) + b'\n'
+                lines = []
+        if lines:
+            yield b'\n'.join(lines) + b'\n'
+        yield dump_json({'cursor': cursor, 'count': count, 'done': done}) + b'\n'
+
+    return StreamingHttpResponse(stream(), content_type='application/x-ndjson')
 
 @login_required
 @require_http_methods(["GET", "POST"])
 def add_transaction(request):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     if request.method == 'GET':
         if is_json_request(request): 
-            return JsonResponse({'status': 'ready', 'required_fields': ['amount', 'type', 'category', 'date']})
-        return render(request, 'tracker/add_transaction.html', {'form': TransactionForm()})
+            return FastJsonResponse({'status': 'ready', 'required_fields': ['amount', 'type', 'category', 'date']})
+
+        # ?job=<id> — a receipt scan is pending or has just finished
+        form = TransactionForm()
+        job = None
+        if request.GET.get('job'):
+            job = jobs.get_job(request.GET['job'], user.id)
+            if job and job.status == 'done':
+                form = TransactionForm(initial=job.result)
+                messages.success(request, "Receipt scanned! Please review details.")
+                job = None
+            elif not job or job.status == 'failed':
+                messages.error(request, "Could not read receipt.")
+                job = None
+        return render(request, 'tracker/add_transaction.html', {'form': form, 'job': job})
 
     if 'receipt_image' in request.FILES and 'amount' not in request.POST:
-        ai_data = scan_receipt(request.FILES['receipt_image'])
-        if ai_data:
-            form = TransactionForm(initial=ai_data)
-            messages.success(request, "Receipt scanned! Please review details.")
-        else:
-            form = TransactionForm()
-            messages.error(request, "Could not read receipt.")
-        return render(request, 'tracker/add_transaction.html', {'form': form})
+        # Read the upload now — the request's temp file is gone once we return
+        image = io.BytesIO(request.FILES['receipt_image'].read())
+        try:
+            job = jobs.submit_job(user.id, 'receipt', scan_receipt, image)
+        except jobs.AIQuotaError as e:
+            if is_json_request(request):
+                return FastJsonResponse({'status': 'error', 'message': str(e)}, status=429)
+            messages.error(request, str(e))
+            return redirect('add_transaction')
+        if is_json_request(request):
+            return FastJsonResponse({
+                'status': 'queued',
+                'job_id': str(job.pk),
+                'status_url': reverse('ai_job_status', args=[job.pk]),
+            }, status=202)
+        return redirect(reverse('add_transaction') + f'?job={job.pk}')
 
     form = TransactionForm(request.POST, request.FILES)
     if form.is_valid():
@@ -872,17 +983,17 @@ def add_transaction(request):
             services.create_transaction(dto)
 
             if is_json_request(request): 
-                return JsonResponse({'status': 'success', 'message': 'Transaction added'}, status=201)
+                return FastJsonResponse({'status': 'success', 'message': 'Transaction added'}, status=201)
             
             messages.success(request, "Transaction added successfully!")
             return redirect('transactions')
 
         except Exception as e:
-             if is_json_request(request): return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+             if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
              messages.error(request, f"Error: {e}")
 
     if is_json_request(request): 
-        return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+        return FastJsonResponse({'status': 'error', 'errors': form.errors}, status=400)
     
     messages.error(request, "Please correct the errors below.")
     return render(request, 'tracker/add_transaction.html', {'form': form})
@@ -893,13 +1004,13 @@ def add_transaction(request):
 def edit_transaction(request, pk):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     try:
         transaction = Transaction.objects.get(pk=pk, user=user)
     except Transaction.DoesNotExist:
-        if is_json_request(request): return JsonResponse({'error': 'Not found'}, status=404)
+        if is_json_request(request): return FastJsonResponse({'error': 'Not found'}, status=404)
         return render(request, '404.html', status=404)
 
     # Capture current page from referrer or query string for redirect
@@ -923,7 +1034,7 @@ def edit_transaction(request, pk):
             
             services.update_transaction(pk, dto)
             
-            if is_json_request(request): return JsonResponse({'status': 'success', 'message': 'Updated'})
+            if is_json_request(request): return FastJsonResponse({'status': 'success', 'message': 'Updated'})
             messages.success(request, 'Transaction updated.')
             redirect_url = reverse('transactions')
             if page:
@@ -931,7 +1042,7 @@ def edit_transaction(request, pk):
             return redirect(redirect_url)
         
         else:
-            if is_json_request(request): return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+            if is_json_request(request): return FastJsonResponse({'status': 'error', 'errors': form.errors}, status=400)
             messages.error(request, "Please correct errors.")
 
     else:
@@ -946,7 +1057,7 @@ def edit_transaction(request, pk):
 def delete_transaction(request, pk):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
     
     # Capture current page from referrer or query string for redirect
@@ -959,14 +1070,14 @@ def delete_transaction(request, pk):
     if request.method in ["DELETE", "POST"]:
         try:
             services.delete_transaction(pk, user.id)
-            if is_json_request(request): return JsonResponse({'status': 'success', 'message': 'Deleted'})
+            if is_json_request(request): return FastJsonResponse({'status': 'success', 'message': 'Deleted'})
             messages.success(request, 'Transaction deleted.')
             redirect_url = reverse('transactions')
             if page:
                 redirect_url += f'?page={page}'
             return redirect(redirect_url)
         except Exception:
-            if is_json_request(request): return JsonResponse({'error': 'Not found'}, status=404)
+            if is_json_request(request): return FastJsonResponse({'error': 'Not found'}, status=404)
             return render(request, '404.html', status=404)
 
     try:
@@ -975,11 +1086,54 @@ def delete_transaction(request, pk):
          return render(request, '404.html', status=404)
 
     if is_json_request(request):
-        return JsonResponse({'status': 'warning', 'message': 'Send DELETE/POST to confirm.'})
+        return FastJsonResponse({'status': 'warning', 'message': 'Send DELETE/POST to confirm.'})
         
     # Template removed — deletions are done via modal on the list page
     return redirect('transactions')
 
+@login_required
+@require_POST
+def bulk_transactions(request):
+    """
+    JSON body {"operations": [{"op": "create"|"update"|"delete", ...}, ...]}.
+    Applies every valid operation in one DB transaction and answers with a
+    result per operation, so an offline queue can flush in one round trip.
+    """
+    try:
+        payload = json.loads(request.body or b'{}')
+    except json.JSONDecodeError:
+        return FastJsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
+
+    try:
+        results = services.bulk_transactions(request.user.id, payload.get('operations') if isinstance(payload, dict) else None)
+    except services.ServiceError as e:
+        return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    summary = {'created': 0, 'updated': 0, 'deleted': 0, 'failed': 0}
+    for r in results:
+        if r['status'] != 'ok':
+            summary['failed'] += 1
+        else:
+            summary[{'create': 'created', 'update': 'updated', 'delete': 'deleted'}[r['op']]] += 1
+
+    return FastJsonResponse({'status': 'success', 'summary': summary, 'results': results})
+
+
+@login_required
+@require_GET
+def sync_changes(request):
+    """
+    Delta sync for offline clients. ?since=<token> from the previous response
+    returns only what changed after it; without one (or once it is too old)
+    the response is a full snapshot flagged "full": true.
+    """
+    try:
+        changes = services.get_changes(request.user.id, request.GET.get('since') or None)
+    except services.ServiceError as e:
+        return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return FastJsonResponse({'status': 'success', **changes})
+
+
 def validate_file_extension(filename):
     if not filename.endswith(('.xlsx', '.csv')):
         raise ValueError("Invalid file type. Only .xlsx and .csv allowed.")
@@ -1009,7 +1163,7 @@ def subscription_audit_view(request):
 
     # ── Pull real transactions from DB ────────────────────────────
     period_qs = (Transaction.objects
-                 .filter(user=user, date__range=[start_date, end_date])
+                 .filter(Period.custom(start_date, end_date).q(), user=user)
                  .order_by('date'))
 
     lines = []
@@ -1038,8 +1192,20 @@ def subscription_audit_view(request):
     results   = None
     submitted = False
     error_msg = None
+    job       = None
 
-    # ── Run audit on POST ─────────────────────────────────────────
+    # ── Pending or finished background audit (?job=<id>) ──────────
+    if request.method == 'GET' and request.GET.get('job'):
+        submitted = True
+        job = jobs.get_job(request.GET['job'], user.id)
+        if job and job.status == 'done':
+            results = job.result
+            job = None
+        elif not job or job.status == 'failed':
+            error_msg = "Tranasctions couldn't be analysed. Please check the format and try again."
+            job = None
+
+    # ── Queue audit on POST ───────────────────────────────────────
     if request.method == 'POST':
         submitted = True
         MAX_AUDIT_CHARS = 20_000  # ~5,000 transactions — prevents DoS/prompt injection
@@ -1064,9 +1230,9 @@ def subscription_audit_view(request):
                 actual_spend = {
                     row['category']: row['total']
                     for row in Transaction.objects.filter(
+                        Period.custom(start_date, end_date).q(),
                         user=user,
                         type='Expense',
-                        date__range=[start_date, end_date]
                     ).values('category').annotate(total=AuditSum('amount'))
                 }
 
@@ -1089,9 +1255,25 @@ def subscription_audit_view(request):
                         + "\n".join(goal_lines)
                     )
 
-                results = audit_subscriptions(combined, start_date_str, end_date_str, goals_summary)
-                if results is None:
-                    error_msg = "Tranasctions couldn't be analysed. Please check the format and try again."
+                # The model call runs on the AI pool; the page polls for it
+                job = jobs.submit_job(
+                    user.id, 'audit', audit_subscriptions,
+                    combined, start_date_str, end_date_str, goals_summary
+                )
+                if is_json_request(request):
+                    return FastJsonResponse({
+                        'status': 'queued',
+                        'job_id': str(job.pk),
+                        'status_url': reverse('ai_job_status', args=[job.pk]),
+                    }, status=202)
+                return redirect(
+                    reverse('audit')
+                    + f'?start_date={start_date_str}&end_date={end_date_str}&job={job.pk}'
+                )
+            except jobs.AIQuotaError as e:
+                if is_json_request(request):
+                    return FastJsonResponse({'status': 'error', 'message': str(e)}, status=429)
+                error_msg = str(e)
             except Exception as e:
                 logger.error(f"Audit error: {e}")
                 error_msg = "Something went wrong running the audit. Please try again."
@@ -1107,6 +1289,7 @@ def subscription_audit_view(request):
 
     return render(request, 'tracker/audit.html', {
         'results':          results,
+        'job':              job,
         'submitted':        submitted,
         'error_msg':        error_msg,
         'pre_filled_text':  pre_filled_text,
@@ -1118,38 +1301,49 @@ def subscription_audit_view(request):
 
 @login_required
 @require_GET
+def ai_job_status(request, job_id):
+    """Polled by the audit and receipt pages while their AI job runs."""
+    job = jobs.get_job(job_id, request.user.id)
+    if not job:
+        return FastJsonResponse({'status': 'error', 'message': 'Job not found.'}, status=404)
+
+    data = {'id': str(job.pk), 'kind': job.kind, 'status': job.status}
+    if job.status == 'done':
+        data['result'] = job.result
+    elif job.status == 'failed':
+        data['error'] = job.error
+    return FastJsonResponse({'status': 'success', 'job': data})
+
+@login_required
+@require_GET
+@json_etag
 def charts(request):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
-    from django.db.models import Case, When, DecimalField
-    totals_agg = Transaction.objects.filter(user=user).aggregate(
-        total_income=Sum(Case(When(type='Income', then='amount'), output_field=DecimalField())),
-        total_expense=Sum(Case(When(type='Expense', then='amount'), output_field=DecimalField())),
-    )
-    total_income  = float(totals_agg['total_income']  or 0)
-    total_expense = float(totals_agg['total_expense'] or 0)
-    balance = total_income - total_expense
-
-    cat_qs = (Transaction.objects
-              .filter(user=user, type='Expense')
-              .values('category')
-              .annotate(total=Sum('amount'))
-              .order_by('-total'))
+    # ?start=&end= (YYYY-MM-DD, either optional) and ?granularity=day|week|month
+    start = request.GET.get('start') or ''
+    end = request.GET.get('end') or ''
+    granularity = request.GET.get('granularity') or 'month'
+    if granularity not in ('day', 'week', 'month'):
+        granularity = 'month'
 
-    category_label_map = dict(Transaction.CATEGORY_CHOICES)
-    category_labels = [category_label_map.get(r['category'], r['category']) for r in cat_qs]
-    category_values = [float(r['total']) for r in cat_qs]
+    try:
+        first = datetime.strptime(start, '%Y-%m-%d').date() if start else None
+        last = datetime.strptime(end, '%Y-%m-%d').date() if end else None
+    except ValueError:
+        if is_json_request(request):
+            return FastJsonResponse({'status': 'error', 'message': 'Dates must be YYYY-MM-DD.'}, status=400)
+        first = last = None
+        start = end = ''
 
-    context = {
-        "total_income": total_income, "total_expense": total_expense, "balance": balance,
-        "category_labels": category_labels,
-        "category_values": category_values,
-    }
-    if is_json_request(request): return JsonResponse({'status': 'success', 'data': context})
-    return render(request, "tracker/charts.html", context)
+    context = services.get_chart_data(user.id, first, last, granularity)
+    if is_json_request(request): return FastJsonResponse({'status': 'success', 'data': context})
+    return render(request, "tracker/charts.html", dict(
+        context, start=start, end=end, granularity=granularity,
+    ))
 
 @login_required
 @require_POST
@@ -1171,94 +1365,71 @@ def import_transactions(request):
 
         msg = f"Successfully imported {count} transaction{'s' if count != 1 else ''}."
         if is_json_request(request):
-            return JsonResponse({'status': 'ok', 'message': msg, 'count': count})
+            return FastJsonResponse({'status': 'ok', 'message': msg, 'count': count})
         messages.success(request, msg)
 
     except ValueError as e:
         if is_json_request(request):
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
         messages.error(request, str(e))
 
     except Exception as e:
         if is_json_request(request):
-            return JsonResponse({'status': 'error', 'message': 'An error occurred during import.'}, status=500)
+            return FastJsonResponse({'status': 'error', 'message': 'An error occurred during import.'}, status=500)
         messages.error(request, "An error occurred during import. Check the file format and try again.")
 
     return redirect('transactions')
         
 @login_required
 @require_GET
+@json_etag
 def goals_list(request, year=None, month=None):
     user = request.user
     if not user.is_authenticated:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+            return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
-    now = timezone.now()
-    
-    form = BudgetGoalForm(user=user) 
+    now = timezone.localdate()
     
     try:
         view_month = int(month or request.GET.get('month') or now.month)
         view_year = int(year or request.GET.get('year') or now.year)
+        # Rejects months outside 1..12 and years whose month can't be a date
+        Period.month(view_year, view_month)
     except ValueError:
         view_month = now.month
         view_year = now.year
 
-    current_goals = list(
-        BudgetGoal.objects.filter(user=user, year=view_year, month=view_month).order_by('category')
-    )
-    
+    # Goals with their month's spend come from the dashboard read model, so an
+    # unchanged month is served from cache without touching the database
+    fragment_cache = _fragment_cache_context(user.id)
+    current_goals = services.get_dashboard_data(
+        user.id, view_year, view_month, stamp=fragment_cache['data_version']
+    )['goals']
+
     is_history = (view_year < now.year) or (view_year == now.year and view_month < now.month)
     can_import = not is_history and not current_goals
 
-
-    expense_totals = list(
-        Transaction.objects.filter(
-            user=user, 
-            type='Expense', 
-            date__year=view_year, 
-            date__month=view_month
-        ).values('category').annotate(total=Sum('amount'))
-    )
-    
-    expense_map = {item['category']: item['total'] for item in expense_totals}
-
-    goals_data = []
-    for goal in current_goals:
-        spent = expense_map.get(goal.category, Decimal('0.00'))
-        
-        goal.actual_spent = spent
-        goal.remaining = goal.target_amount - spent
-        
-        if goal.target_amount > 0:
-            goal.progress_percent = min((float(spent) / float(goal.target_amount)) * 100, 100)
-        else:
-            goal.progress_percent = 0
-            
-        goal.is_over_budget = goal.remaining < 0
-        
-        goals_data.append({
-            'id': goal.id, 
-            'category': goal.get_category_display(),
-            'target': float(goal.target_amount),
-            'spent': float(spent), 
-            'remaining': float(goal.remaining)
-        })
-
     if is_json_request(request):
-        return JsonResponse({'status': 'success', 'data': goals_data})
+        return FastJsonResponse({'status': 'success', 'data': [{
+            'id': goal['id'],
+            'category': goal['category_display'],
+            'target': float(goal['target_amount']),
+            'spent': float(goal['actual_spent']),
+            'remaining': float(goal['remaining'])
+        } for goal in current_goals]})
 
     return render(request, 'tracker/goals_list.html', {
         'goals': current_goals, 
-        'form': form,
+        'form': BudgetGoalForm(user=user),
         'view_month': datetime(view_year, view_month, 1), 
         'view_year': view_year,
         'months_choices': [(i, datetime(2000, i, 1).strftime('%B')) for i in range(1, 13)],
         'year_choices': [now.year, now.year-1, now.year-2],
         'is_history': is_history, 
         'can_import': can_import,
+        **fragment_cache,
     })
 
 @login_required
@@ -1266,7 +1437,7 @@ def goals_list(request, year=None, month=None):
 def set_goals(request):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     try:
@@ -1281,7 +1452,7 @@ def set_goals(request):
         goal = services.set_budget_goal(dto)
 
         if is_json_request(request): 
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'success', 
                 'message': f'Goal set for {dto.month}/{dto.year}',
                 'data': {
@@ -1297,7 +1468,7 @@ def set_goals(request):
 
     except ValueError as e:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
         messages.error(request, str(e))
         return redirect('goals_list')
 
@@ -1306,7 +1477,7 @@ def set_goals(request):
 def edit_goal(request, pk):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     try:
@@ -1325,7 +1496,7 @@ def edit_goal(request, pk):
             )
             services.update_goal(dto)
             
-            if is_json_request(request): return JsonResponse({'status': 'success'})
+            if is_json_request(request): return FastJsonResponse({'status': 'success'})
             messages.success(request, "Goal updated.")
             return redirect('goals_list')
     else:
@@ -1339,24 +1510,26 @@ def edit_goal(request, pk):
 def delete_goal(request, pk):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
-    try:
-        goal = BudgetGoal.objects.get(pk=pk, user=user)
-    except BudgetGoal.DoesNotExist:
-        if is_json_request(request): return JsonResponse({'error': 'Goal not found'}, status=404)
-        return render(request, '404.html', status=404)
-
     if request.method in ["POST", "DELETE"]:
-        goal.delete()
-        
-        if is_json_request(request): return JsonResponse({'status': 'deleted'})
+        try:
+            services.delete_goal(pk, user.id)
+        except Http404:
+            if is_json_request(request): return FastJsonResponse({'error': 'Goal not found'}, status=404)
+            return render(request, '404.html', status=404)
+
+        if is_json_request(request): return FastJsonResponse({'status': 'deleted'})
         messages.success(request, "Goal deleted.")
         return redirect('goals_list')
 
+    if not BudgetGoal.objects.filter(pk=pk, user=user).exists():
+        if is_json_request(request): return FastJsonResponse({'error': 'Goal not found'}, status=404)
+        return render(request, '404.html', status=404)
+
     if is_json_request(request):
-        return JsonResponse({'status': 'warning', 'message': 'Send DELETE/POST to confirm.'})
+        return FastJsonResponse({'status': 'warning', 'message': 'Send DELETE/POST to confirm.'})
 
     # Template removed — deletions are done via modal on the goals page
     return redirect('goals_list')
@@ -1366,7 +1539,7 @@ def delete_goal(request, pk):
 def clear_monthly_goals(request, year, month):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     now = timezone.now()
@@ -1374,15 +1547,13 @@ def clear_monthly_goals(request, year, month):
     month = int(month)
 
     if year < now.year or (year == now.year and month < now.month):
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Cannot clear past goals.'}, status=403)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Cannot clear past goals.'}, status=403)
         messages.warning(request, "Cannot clear past goals.")
         return redirect(reverse('goals_list') + f"?year={year}&month={month}")
     
-    count, _ = BudgetGoal.objects.filter(user=user, year=year, month=month).delete()
-    
-    BudgetLock.objects.get_or_create(user=user, year=year, month=month)
+    count = services.clear_monthly_goals(user.id, year, month)
 
-    if is_json_request(request): return JsonResponse({'status': 'success', 'deleted': count})
+    if is_json_request(request): return FastJsonResponse({'status': 'success', 'deleted': count})
     messages.warning(request, f"Cleared {count} goals.")
     return redirect(reverse('goals_list') + f"?year={year}&month={month}")
 
@@ -1390,7 +1561,7 @@ def clear_monthly_goals(request, year, month):
 def import_previous_goals(request):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     try:
@@ -1417,7 +1588,7 @@ def import_previous_goals(request):
 def change_currency(request):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     try:
@@ -1431,7 +1602,7 @@ def change_currency(request):
         request.session.pop('currency_symbol', None)
 
         if is_json_request(request):
-            return JsonResponse({
+            return FastJsonResponse({
                 'status': 'success',
                 'message': 'Currency updated.',
                 'currency': dto.currency_code
@@ -1441,7 +1612,7 @@ def change_currency(request):
         
     except ValueError as e:
         if is_json_request(request):
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
         messages.error(request, str(e))
         
     # Never trust raw Referer — use Django URL reversing as fallback
@@ -1455,14 +1626,14 @@ def change_currency(request):
 def resend_verification_code_profile(request):
     user = request.user
     if not user.is_authenticated:
-        if is_json_request(request): return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+        if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     cache_key = f"email_change_resend_cooldown_{user.id}"
     if cache.get(cache_key):
         msg = "Please wait a minute before requesting another code."
         if is_json_request(request):
-            return JsonResponse({'status': 'error', 'message': msg}, status=429)
+            return FastJsonResponse({'status': 'error', 'message': msg}, status=429)
         messages.warning(request, msg)
         return redirect('verify_email_change')
 
@@ -1470,7 +1641,7 @@ def resend_verification_code_profile(request):
         success, result = services.resend_email_change_code(user.id)
 
         if not success:
-            if is_json_request(request): return JsonResponse({'status': 'error', 'message': result}, status=429)
+            if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': result}, status=429)
             messages.warning(request, result)
             return redirect('verify_email_change')
 
@@ -1484,7 +1655,7 @@ def resend_verification_code_profile(request):
 
         cache.set(cache_key, True, 60)
 
-        if is_json_request(request): return JsonResponse({'status': 'success', 'message': 'Code resent'})
+        if is_json_request(request): return FastJsonResponse({'status': 'success', 'message': 'Code resent'})
         messages.success(request, f"New code sent to {email_to}")
         
     except UserProfile.DoesNotExist:
@@ -1499,7 +1670,7 @@ def profile_settings(request):
 
     if not user.is_authenticated:
         if is_json_request(request): 
-            return JsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
+            return FastJsonResponse({'status': 'error', 'message': 'Unauthorized'}, status=401)
         return redirect('login')
 
     form = ProfileUpdateForm(instance=user)
@@ -1509,7 +1680,7 @@ def profile_settings(request):
             cache_key = f"email_init_cooldown_{user.id}"
             if cache.get(cache_key):
                 msg = "Please wait a minute before requesting another code."
-                if is_json_request(request): return JsonResponse({'status': 'error', 'message': msg}, status=429)
+                if is_json_request(request): return FastJsonResponse({'status': 'error', 'message': msg}, status=429)
                 messages.warning(request, msg)
                 return redirect('profile')
             try:
@@ -1530,7 +1701,7 @@ def profile_settings(request):
                 cache.set(cache_key, True, 60)
 
                 if is_json_request(request):
-                    return JsonResponse({
+                    return FastJsonResponse({
                         'status': 'success', 
                         'message': 'Verification code sent.',
                         'next_step': 'Verify at /verify-email-change/'
@@ -1539,7 +1710,7 @@ def profile_settings(request):
 
             except Exception as e:
                 if is_json_request(request):
-                    return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+                    return FastJsonResponse({'status': 'error', 'message': str(e)}, status=400)
                 messages.error(request, str(e))
 
         else:
@@ -1557,13 +1728,13 @@ def profile_settings(request):
                     from django.db import IntegrityError
                     msg = "That username is already taken."
                     if is_json_request(request):
-                        return JsonResponse({'status': 'error', 'message': msg}, status=400)
+                        return FastJsonResponse({'status': 'error', 'message': msg}, status=400)
                     messages.error(request, msg)
                     return render(request, 'tracker/profile.html', {'form': form})
 
                 if is_json_request(request): 
                     user_profile = user.userprofile
-                    return JsonResponse({
+                    return FastJsonResponse({
                         'status': 'updated',
                         'data': {
                             'username': user.username,
@@ -1577,7 +1748,7 @@ def profile_settings(request):
                 messages.success(request, 'Profile updated.')
             else:
                 if is_json_request(request):
-                    return JsonResponse({'status': 'error', 'errors': form.errors}, status=400)
+                    return FastJsonResponse({'status': 'error', 'errors': form.errors}, status=400)
 
     else:
         if is_json_request(request):
@@ -1589,7 +1760,7 @@ def profile_settings(request):
                 'email': user.email,
                 'currency': user_profile.currency_code
             }
-            return JsonResponse({'status': 'success', 'data': data})
+            return FastJsonResponse({'status': 'success', 'data': data})
 
     return render(request, 'tracker/profile_settings.html', {
         'form': form, 
@@ -1601,28 +1772,33 @@ def profile_settings(request):
 @require_GET
 def password_change_done_custom(request):
     if is_json_request(request):
-        return JsonResponse({
+        return FastJsonResponse({
             'status': 'success', 
             'message': 'Password changed successfully.'
         })
 
     return render(request, 'tracker/password_change_done.html')
 
+def _wants_json_error(request):
+    # /api/v1/ runs without the session and auth middleware (handlers.py), so
+    # its errors can't render the HTML templates whatever the Accept header
+    return is_json_request(request) or request.path_info.startswith(API_PREFIX)
+
 def custom_400_handler(request, exception=None):
-    if is_json_request(request): return JsonResponse({'error': 'Bad Request'}, status=400)
+    if _wants_json_error(request): return FastJsonResponse({'error': 'Bad Request'}, status=400)
     return render(request, 'errors/400.html', status=400)
 
 def custom_403_handler(request, exception=None):
-    if is_json_request(request): return JsonResponse({'error': 'Forbidden'}, status=403)
+    if _wants_json_error(request): return FastJsonResponse({'error': 'Forbidden'}, status=403)
     return render(request, 'errors/403.html', status=403)
 
 def custom_404_handler(request, exception):
-    if is_json_request(request): return JsonResponse({'error': 'Not Found'}, status=404)
+    if _wants_json_error(request): return FastJsonResponse({'error': 'Not Found'}, status=404)
     return render(request, 'errors/404.html', status=404)
 
 def custom_500_handler(request):
-    if is_json_request(request): return JsonResponse({'error': 'Server Error'}, status=500)
+    if _wants_json_error(request): return FastJsonResponse({'error': 'Server Error'}, status=500)
     return render(request, 'errors/500.html', status=500)
 
 def csrf_failure_json(request, reason=""):
-    return JsonResponse({'status': 'error', 'message': f'CSRF Failure: {reason}'}, status=403)
\ No newline at end of file
+    return FastJsonResponse({'status': 'error', 'message': f'CSRF Failure: {reason}'}, status=403)
\ No newline at end of file